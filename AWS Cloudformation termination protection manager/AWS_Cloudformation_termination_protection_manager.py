@@ -1,12 +1,26 @@
-import boto3
+import os
+import sys
+import asyncio
 from botocore.exceptions import ClientError
 from rich.table import Table
 from rich.console import Console
 import argparse
 
+# Make the shared aws_security_common package importable when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_security_common.clients import get_client, get_client_pool
+from aws_security_common.regions import RegionDiscovery, add_region_arguments
+from aws_security_common.async_calls import AsyncAwsCaller, add_async_arguments
+from aws_security_common.instrumentation import PROFILER, add_profile_arguments, enable_profiling
+from aws_security_common.checkpoints import CheckpointJournal, add_checkpoint_arguments
+from aws_security_common.output import add_output_arguments, report_table
+
 # Initialize the Rich console
 console = Console()
 
+# Stack statuses considered active
+ACTIVE_STACK_STATUSES = ["CREATE_COMPLETE", "UPDATE_COMPLETE", "ROLLBACK_COMPLETE"]
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Manage CloudFormation stack termination protection')
@@ -14,41 +28,40 @@ def parse_arguments():
                        type=str,
                        help='AWS profile name to use',
                        default='default')
+    add_region_arguments(parser)
+    add_async_arguments(parser)
+    add_profile_arguments(parser)
+    add_checkpoint_arguments(parser, '.aws_cloudformation_checkpoint.jsonl')
+    add_output_arguments(parser)
     return parser.parse_args()
 
 def get_active_stacks(region, profile_name):
     """Retrieve the names of active CloudFormation stacks in a specific region."""
     try:
-        session = boto3.Session(profile_name=profile_name)
-        cf_client = session.client("cloudformation", region_name=region)
-        response = cf_client.list_stacks(
-            StackStatusFilter=[
-                "CREATE_COMPLETE", "UPDATE_COMPLETE", "ROLLBACK_COMPLETE"
-            ]
-        )
-        active_stacks = response.get("StackSummaries", [])
+        cf_client = get_client("cloudformation", region, profile_name)
+        active_stacks = []
+        for page in cf_client.get_paginator("list_stacks").paginate(StackStatusFilter=ACTIVE_STACK_STATUSES):
+            active_stacks.extend(page.get("StackSummaries", []))
         return active_stacks
     except ClientError as e:
         console.print(f"[bold red]Error fetching stack names for region {region}: {e}[/bold red]")
-        return []
+        return None
 
 def get_termination_protection_status(stack_name, region, profile_name):
     """Check whether termination protection is enabled for a stack."""
     try:
-        session = boto3.Session(profile_name=profile_name)
-        cf_client = session.client("cloudformation", region_name=region)
+        cf_client = get_client("cloudformation", region, profile_name)
         response = cf_client.describe_stacks(StackName=stack_name)
         termination_protection = response['Stacks'][0].get('EnableTerminationProtection', False)
         return termination_protection
     except ClientError as e:
         console.print(f"[bold red]Error checking termination protection for stack {stack_name} in region {region}: {e}[/bold red]")
-        return False
+        return None  # Unknown; treated as not enabled but not checkpointed
 
 def enable_termination_protection(stack_name, region, profile_name):
     """Enable termination protection for a given stack in a specific region."""
     try:
-        session = boto3.Session(profile_name=profile_name)
-        cf_client = session.client("cloudformation", region_name=region)
+        cf_client = get_client("cloudformation", region, profile_name)
         cf_client.update_termination_protection(
             StackName=stack_name,
             EnableTerminationProtection=True
@@ -57,23 +70,85 @@ def enable_termination_protection(stack_name, region, profile_name):
     except ClientError as e:
         return False, f"Failed to enable termination protection for stack: {stack_name} in region {region}. Error: {e}"
 
-def get_all_regions(profile_name):
-    """Get a list of all AWS regions."""
-    session = boto3.Session(profile_name=profile_name)
-    ec2_client = session.client('ec2')
-    response = ec2_client.describe_regions()
-    return [region['RegionName'] for region in response['Regions']]
+def record_stacks(journal, region, active_stacks):
+    """Checkpoint a region's active stacks (name and status are all the report needs)."""
+    if journal and active_stacks is not None:
+        journal.record(("region", region), [{"StackName": stack["StackName"], "StackStatus": stack["StackStatus"]}
+                                            for stack in active_stacks])
+
+def record_protection(journal, region, stack_name, termination_protection):
+    """Checkpoint a stack's termination protection status unless it could not be read."""
+    if journal and termination_protection is not None:
+        journal.record(("stack", region, stack_name), termination_protection)
+
+def fetch_stacks(regions, profile_name, journal=None):
+    """Yield (region, active stacks, termination protection per stack) one region at a time."""
+    for region in regions:
+        if journal and journal.done(("region", region)):
+            active_stacks = journal.result(("region", region))
+        else:
+            active_stacks = get_active_stacks(region, profile_name)
+            record_stacks(journal, region, active_stacks)
+
+        protections = []
+        for stack in active_stacks or []:
+            if journal and journal.done(("stack", region, stack["StackName"])):
+                protections.append(journal.result(("stack", region, stack["StackName"])))
+                continue
+            termination_protection = get_termination_protection_status(stack["StackName"], region, profile_name)
+            record_protection(journal, region, stack["StackName"], termination_protection)
+            protections.append(termination_protection)
+        yield region, active_stacks, protections
+
+async def fetch_stacks_async(regions, profile_name, max_concurrency, journal=None):
+    """Return (region, active stacks, termination protection per stack) for all regions, fetched concurrently."""
+    async with AsyncAwsCaller(profile_name, max_concurrency=max_concurrency) as aws:
+        async def get_protection(stack_name, region):
+            if journal and journal.done(("stack", region, stack_name)):
+                return journal.result(("stack", region, stack_name))
+            try:
+                response = await aws.call("cloudformation", region, "describe_stacks", StackName=stack_name)
+                termination_protection = response['Stacks'][0].get('EnableTerminationProtection', False)
+            except ClientError as e:
+                console.print(f"[bold red]Error checking termination protection for stack {stack_name} in region {region}: {e}[/bold red]")
+                return None
+            record_protection(journal, region, stack_name, termination_protection)
+            return termination_protection
+
+        async def fetch_region(region):
+            if journal and journal.done(("region", region)):
+                active_stacks = journal.result(("region", region))
+            else:
+                try:
+                    pages = await aws.paginate("cloudformation", region, "list_stacks", StackStatusFilter=ACTIVE_STACK_STATUSES)
+                except ClientError as e:
+                    console.print(f"[bold red]Error fetching stack names for region {region}: {e}[/bold red]")
+                    return region, None, []
+                active_stacks = [stack for page in pages for stack in page.get("StackSummaries", [])]
+                record_stacks(journal, region, active_stacks)
+            protections = await asyncio.gather(*(get_protection(stack["StackName"], region) for stack in active_stacks))
+            return region, active_stacks, protections
+
+        return await asyncio.gather(*(fetch_region(region) for region in regions))
+
+def get_all_regions(discovery, args):
+    """Get the enabled AWS regions (cached per account) after applying the region filters."""
+    return discovery.regions(args.regions, args.skip_empty_regions)
 
 def main():
     """Main function to manage termination protection for active stacks in all regions."""
     # Parse command line arguments
     args = parse_arguments()
     profile_name = args.profile
+    enable_profiling(args.profile_report, console)
 
     # Print which profile is being used
     console.print(f"[bold blue]Using AWS profile: {profile_name}[/bold blue]")
 
-    regions = get_all_regions(profile_name)
+    with PROFILER.phase("Region discovery"):
+        discovery = RegionDiscovery(get_client_pool(profile_name), "cloudformation",
+                                    ttl=args.region_cache_ttl, refresh=args.refresh_regions)
+        regions = get_all_regions(discovery, args)
     if not regions:
         console.print("[bold red]No regions found! Exiting...[/bold red]")
         return
@@ -86,43 +161,70 @@ def main():
     table.add_column("Termination Protection", justify="center", style="yellow")
     table.add_column("Reason (if not enabled)", style="white")
 
-    # Process each region
-    stacks_info = []
-    for region in regions:
-        active_stacks = get_active_stacks(region, profile_name)
-        if not active_stacks:
-            continue
-
-        for stack in active_stacks:
-            stack_name = stack["StackName"]
-            status = stack["StackStatus"]
-            termination_protection = get_termination_protection_status(stack_name, region, profile_name)
-            if termination_protection:
-                protection_status = "Enabled"
-                reason = ""
+    # Regions and stacks finished by an interrupted run are read back from the checkpoint journal
+    journal = CheckpointJournal(args.checkpoint, {"tool": "cloudformation", "account": discovery.account_id}, resume=args.resume)
+    if journal.resumed:
+        console.print(f"[bold blue]Resuming: {journal.resumed} completed region(s) and stack(s) loaded from {args.checkpoint}[/bold blue]")
+
+    with PROFILER.phase("Stack enumeration"):
+        # Process each region
+        if args.use_async:
+            region_results = asyncio.run(fetch_stacks_async(regions, profile_name, args.max_concurrency, journal))
+        else:
+            region_results = fetch_stacks(regions, profile_name, journal)
+
+        stacks_info = []
+        incomplete = False  # A region or stack whose ClientError was reported and returned as None
+        for region, active_stacks, protections in region_results:
+            if active_stacks is not None:  # Only remember regions that were actually probed
+                discovery.record(region, active_stacks)
             else:
-                protection_status = "Disabled"
-                reason = "Termination protection is not enabled."
-
-            stacks_info.append({
-                "region": region,
-                "stack_name": stack_name,
-                "status": status,
-                "protection_status": protection_status,
-                "reason": reason
-            })
-
-    # Display the table with active stacks
-    for info in stacks_info:
-        table.add_row(
-            info['region'], 
-            info['stack_name'], 
-            info['status'], 
-            info['protection_status'], 
-            info['reason']
-        )
+                incomplete = True
+            if not active_stacks:
+                continue
+
+            for stack, termination_protection in zip(active_stacks, protections):
+                stack_name = stack["StackName"]
+                status = stack["StackStatus"]
+                if termination_protection is None:
+                    incomplete = True
+                    protection_status = "Unknown"
+                    reason = "Termination protection status could not be read."
+                elif termination_protection:
+                    protection_status = "Enabled"
+                    reason = ""
+                else:
+                    protection_status = "Disabled"
+                    reason = "Termination protection is not enabled."
+
+                stacks_info.append({
+                    "region": region,
+                    "stack_name": stack_name,
+                    "status": status,
+                    "protection_status": protection_status,
+                    "reason": reason
+                })
 
-    console.print(table)
+        discovery.save()
+        if incomplete:
+            # Keep the completed units so a rerun with --resume only retries the failed ones
+            journal.close()
+            console.print(f"[bold yellow]Some regions or stacks could not be read; rerun with --resume to retry them (progress kept in {args.checkpoint}).[/bold yellow]")
+        else:
+            journal.complete()
+
+    # Display the table with active stacks, rendering at most --max-rows of them
+    with PROFILER.phase("Render table"):
+        stacks_table = report_table(table, args, "stacks")
+        for info in stacks_info:
+            stacks_table.add_row(
+                info['region'], 
+                info['stack_name'], 
+                info['status'], 
+                info['protection_status'], 
+                info['reason']
+            )
+        stacks_table.print(console)
 
     # Ask for user input whether to proceed with enabling termination protection
     proceed = console.input("[bold cyan]Do you want to enable termination protection for these stacks? (yes/no): [/bold cyan]").strip().lower()
@@ -135,17 +237,19 @@ def main():
         result_table.add_column("Status", justify="center", style="green")
         result_table.add_column("Termination Protection", justify="center", style="yellow")
         result_table.add_column("Message", style="white")
+        result_table = report_table(result_table, args, "update")
 
         for info in stacks_info:
             stack_name = info['stack_name']
             region = info['region']
-            success, message = enable_termination_protection(stack_name, region, profile_name)
+            with PROFILER.phase("Enable protection"):
+                success, message = enable_termination_protection(stack_name, region, profile_name)
             status = "Success" if success else "Failed"
             protection_status = "Enabled" if success else "Not Enabled"
             result_table.add_row(region, stack_name, status, protection_status, message)
 
         # Display the result table after the update
-        console.print(result_table)
+        result_table.print(console)
     else:
         console.print("[bold red]Exiting without making changes...[/bold red]")
 
@@ -1,23 +1,27 @@
 """
 Usage: 
 aws iam get-account-authorization-details --profile tazapay > gaad.json
-Mention the above json file in line 20 below..
+Mention the above json file in the __main__ block at the bottom of this script..
 
 """
 
 import json
 import csv
+import os
+import sys
+import argparse
 from rich.console import Console
 from rich.table import Table
 from rich.align import Align
 
+# Make the shared aws_security_common package importable when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_security_common.instrumentation import PROFILER, add_profile_arguments, enable_profiling
+from aws_security_common.output import ReportTable, add_output_arguments, report_table
+
 # Initialize a console for Rich output
 console = Console()
 
-# Load the JSON file
-with open('gaad.json') as f:
-    data = json.load(f)
-
 # Define permissions to search for
 exact_permissions = {"secretsmanager:GetSecretValue", "secretsmanager:*"}
 prefix_permissions = {}  # Only include prefixes if desired
@@ -29,13 +33,6 @@ prefix_permissions = {"secretsmanager:","s3:"}
 
 """
 
-# Initialize a set to store unique rows for the main table output
-unique_entries = set()
-# Initialize a set to track groups that appear in the main permissions table
-groups_with_permissions = set()
-# Dictionary to store group-to-user mappings for users in groups with matching permissions
-group_user_mapping = {}
-
 # Function to check if an action matches exact or prefix permissions, including full access (*)
 def matches_permission(action):
     # Check if action is an exact match, matches a prefix, or is "*"
@@ -45,194 +42,132 @@ def matches_permission(action):
         return any(action.startswith(prefix.rstrip("*")) for prefix in prefix_permissions)
     return False
 
-# Process user groups and check their permissions
-for group in data.get("GroupDetailList", []):
-    group_name = group.get("GroupName")
-    inline_policies = group.get("GroupPolicyList", [])
-    managed_policies = group.get("AttachedManagedPolicies", [])
-
-    # Initialize an empty list for each group in the mapping
-    group_user_mapping[group_name] = []
-
-    # Check inline policies for groups
-    for policy in inline_policies:
-        policy_name = policy.get("PolicyName")
-        policy_doc = policy.get("PolicyDocument", {}).get("Statement", [])
-        
-        for statement in policy_doc:
-            actions = statement.get("Action", [])
-            if isinstance(actions, str):
-                actions = [actions]
-            matched_actions = [action for action in actions if matches_permission(action)]
-            
-            if matched_actions:
-                groups_with_permissions.add(group_name)  # Track this group as it has matching permissions
-                for action in matched_actions:
-                    unique_entries.add((group_name, policy_name, "group", "inline", action))
-
-    # Check managed policies for groups
+# Principal lists of a GAAD document in table order: (resource type, list key, name key, inline policy key)
+PRINCIPAL_LISTS = [
+    ("user", "UserDetailList", "UserName", "UserPolicyList"),
+    ("group", "GroupDetailList", "GroupName", "GroupPolicyList"),
+    ("role", "RoleDetailList", "RoleName", "RolePolicyList"),
+]
+
+# Yield the matching permissions of one principal's inline and managed policies, each once
+def principal_matching_permissions(principal_name, resource_type, inline_policies, managed_policies, policies_by_arn):
+    policies = [(policy.get("PolicyName"), "inline", policy.get("PolicyDocument", {}).get("Statement", []))
+                for policy in inline_policies]
     for policy in managed_policies:
-        policy_arn = policy.get("PolicyArn")
-        
-        for managed_policy in data.get("Policies", []):
-            if managed_policy.get("Arn") == policy_arn:
-                policy_name = managed_policy.get("PolicyName")
-                policy_doc = managed_policy.get("PolicyVersionList", [])[0].get("Document", {}).get("Statement", [])
-                
-                for statement in policy_doc:
-                    actions = statement.get("Action", [])
-                    if isinstance(actions, str):
-                        actions = [actions]
-                    matched_actions = [action for action in actions if matches_permission(action)]
-                    
-                    if matched_actions:
-                        groups_with_permissions.add(group_name)  # Track this group as it has matching permissions
-                        for action in matched_actions:
-                            unique_entries.add((group_name, policy_name, "group", "managed", action))
-
-# Map users to their respective groups with permissions
-for user in data.get("UserDetailList", []):
-    user_name = user.get("UserName")
-    groups = user.get("GroupList", [])  # Groups this user belongs to
-    
-    for group in groups:
-        if group in group_user_mapping:
-            group_user_mapping[group].append(user_name)  # Add user to the group if it has matching permissions
-
-# Process individual IAM users
-for user in data.get("UserDetailList", []):
-    user_name = user.get("UserName")
-    inline_policies = user.get("UserPolicyList", [])
-    managed_policies = user.get("AttachedManagedPolicies", [])
-
-    # Process inline policies for users
-    for policy in inline_policies:
-        policy_name = policy.get("PolicyName")
-        policy_doc = policy.get("PolicyDocument", {}).get("Statement", [])
-        
-        for statement in policy_doc:
-            actions = statement.get("Action", [])
-            if isinstance(actions, str):
-                actions = [actions]
-            matched_actions = [action for action in actions if matches_permission(action)]
-            
-            if matched_actions:
-                for action in matched_actions:
-                    unique_entries.add((user_name, policy_name, "user", "inline", action))
+        managed_policy = policies_by_arn.get(policy.get("PolicyArn"))
+        if managed_policy:
+            policy_doc = managed_policy.get("PolicyVersionList", [])[0].get("Document", {}).get("Statement", [])
+            policies.append((managed_policy.get("PolicyName"), "managed", policy_doc))
 
-    # Process managed policies for users
-    for policy in managed_policies:
-        policy_arn = policy.get("PolicyArn")
-        
-        for managed_policy in data.get("Policies", []):
-            if managed_policy.get("Arn") == policy_arn:
-                policy_name = managed_policy.get("PolicyName")
-                policy_doc = managed_policy.get("PolicyVersionList", [])[0].get("Document", {}).get("Statement", [])
-                
-                for statement in policy_doc:
-                    actions = statement.get("Action", [])
-                    if isinstance(actions, str):
-                        actions = [actions]
-                    matched_actions = [action for action in actions if matches_permission(action)]
-                    
-                    if matched_actions:
-                        for action in matched_actions:
-                            unique_entries.add((user_name, policy_name, "user", "managed", action))
-
-# Process individual IAM roles
-for role in data.get("RoleDetailList", []):
-    role_name = role.get("RoleName")
-    inline_policies = role.get("RolePolicyList", [])
-    managed_policies = role.get("AttachedManagedPolicies", [])
-
-    # Process inline policies for roles
-    for policy in inline_policies:
-        policy_name = policy.get("PolicyName")
-        policy_doc = policy.get("PolicyDocument", {}).get("Statement", [])
-        
+    seen = set()
+    for policy_name, policy_type, policy_doc in policies:
         for statement in policy_doc:
             actions = statement.get("Action", [])
             if isinstance(actions, str):
                 actions = [actions]
-            matched_actions = [action for action in actions if matches_permission(action)]
-            
-            if matched_actions:
-                for action in matched_actions:
-                    unique_entries.add((role_name, policy_name, "role", "inline", action))
-
-    # Process managed policies for roles
-    for policy in managed_policies:
-        policy_arn = policy.get("PolicyArn")
-        
-        for managed_policy in data.get("Policies", []):
-            if managed_policy.get("Arn") == policy_arn:
-                policy_name = managed_policy.get("PolicyName")
-                policy_doc = managed_policy.get("PolicyVersionList", [])[0].get("Document", {}).get("Statement", [])
-                
-                for statement in policy_doc:
-                    actions = statement.get("Action", [])
-                    if isinstance(actions, str):
-                        actions = [actions]
-                    matched_actions = [action for action in actions if matches_permission(action)]
-                    
-                    if matched_actions:
-                        for action in matched_actions:
-                            unique_entries.add((role_name, policy_name, "role", "managed", action))
-
-# Convert the set to a list for tabulation
-table_data = list(unique_entries)
-
-# Sort by Resource Type (users first, then groups, then roles)
-sort_order = {"user": 1, "group": 2, "role": 3}
-table_data.sort(key=lambda x: (sort_order.get(x[2], 4), x[0]))
-
-#print('##### Welcome to the AWS Permissions Checker by z0x0z #####')
-
-# Display the main permissions table with Rich and left-aligned title
-main_table = Table(show_header=True, header_style="bold #00FFFF", title="\n##### Welcome to the AWS Permissions Checker by Gopikrishna #####\n##### Permissions Table Sorted by Resource Type #####", title_justify="center", title_style="bold #6a5acd")
-
-# Adding center-aligned headers, but setting row justification to left
-main_table.add_column(Align("Principle", align="center"), justify="left")
-main_table.add_column(Align("Policy Name", align="center"), justify="left")
-main_table.add_column(Align("Resource Type", align="center"), justify="left")
-main_table.add_column(Align("Policy Type", align="center"), justify="left")
-main_table.add_column(Align("Permission", align="center"), justify="left")
-
-for row in table_data:
-    main_table.add_row(*map(str, row))
-
-console.print(main_table)
-
-# Display tables for each group showing group members, only if the group exists in the main permissions table
-print('\n\nOnly the groups which has IAM Users attached to it are displayed.. Groups without IAM Users (Empty Groups) are not displayed\n')
-for group_name, users in group_user_mapping.items():
-    if group_name in groups_with_permissions and users:  # Display only if group exists in main table
-        user_table = Table(show_header=True, header_style="bold #ff69b4")
-        user_table.add_column(Align(f"Users in '{group_name}' Group", align="center"), justify="left")
-
-        for user in users:
-            user_table.add_row(user)
-
-        console.print(user_table)
-
-# Option to save as CSV
-export_to_csv = input("Would you like to export the output to a CSV file? (yes/no): ").strip().lower()
-if export_to_csv == "yes":
-    with open("aws_iam.csv", mode="w", newline="") as file:
-        writer = csv.writer(file)
+            for action in actions:
+                entry = (principal_name, policy_name, resource_type, policy_type, action)
+                if matches_permission(action) and entry not in seen:
+                    seen.add(entry)
+                    yield entry
+
+# Yield every matching permission in a GAAD document as it is found, sorted by resource type
+# (users first, then groups, then roles) and name; groups with a match are added to groups_with_permissions
+def iter_matching_permissions(data, groups_with_permissions=None):
+    policies_by_arn = {policy.get("Arn"): policy for policy in data.get("Policies", [])}
+    for resource_type, list_key, name_key, inline_key in PRINCIPAL_LISTS:
+        for principal in sorted(data.get(list_key, []), key=lambda principal: principal.get(name_key) or ""):
+            principal_name = principal.get(name_key)
+            for entry in principal_matching_permissions(principal_name, resource_type, principal.get(inline_key, []),
+                                                        principal.get("AttachedManagedPolicies", []), policies_by_arn):
+                if resource_type == "group" and groups_with_permissions is not None:
+                    groups_with_permissions.add(principal_name)  # Track this group as it has matching permissions
+                yield entry
+
+# Map every group to the users in it
+def map_group_users(data):
+    group_user_mapping = {group.get("GroupName"): [] for group in data.get("GroupDetailList", [])}
+    for user in data.get("UserDetailList", []):
+        for group in user.get("GroupList", []):  # Groups this user belongs to
+            if group in group_user_mapping:
+                group_user_mapping[group].append(user.get("UserName"))
+    return group_user_mapping
+
+# Find every matching permission in a GAAD document
+def find_matching_permissions(data):
+    groups_with_permissions = set()
+    table_data = list(iter_matching_permissions(data, groups_with_permissions))
+    return table_data, map_group_users(data), groups_with_permissions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find IAM principals with sensitive permissions in gaad.json")
+    add_profile_arguments(parser)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    enable_profiling(args.profile_report, console)
+
+    # Load the JSON file
+    with PROFILER.phase("Load gaad.json"):
+        with open('gaad.json') as f:
+            data = json.load(f)
+
+    group_user_mapping = map_group_users(data)
+    groups_with_permissions = set()
+
+    #print('##### Welcome to the AWS Permissions Checker by z0x0z #####')
+
+    # Display the main permissions table with Rich and left-aligned title
+    main_table = Table(show_header=True, header_style="bold #00FFFF", title="\n##### Welcome to the AWS Permissions Checker by Gopikrishna #####\n##### Permissions Table Sorted by Resource Type #####", title_justify="center", title_style="bold #6a5acd")
+
+    # Adding center-aligned headers, but setting row justification to left
+    main_table.add_column(Align("Principle", align="center"), justify="left")
+    main_table.add_column(Align("Policy Name", align="center"), justify="left")
+    main_table.add_column(Align("Resource Type", align="center"), justify="left")
+    main_table.add_column(Align("Policy Type", align="center"), justify="left")
+    main_table.add_column(Align("Permission", align="center"), justify="left")
+
+    # Render at most --max-rows permissions (the rest summarised by resource type) and stream all of them to --export
+    main_table = report_table(main_table, args, summary_column=2,
+                              columns=["Name", "Policy Name", "Resource Type", "Policy Type", "Permission"])
+    # Matches go to the table (and --export) as they are found instead of being collected first
+    with PROFILER.phase("Match permissions"):
+        for row in iter_matching_permissions(data, groups_with_permissions):
+            main_table.add_row(*map(str, row))
+
+    with PROFILER.phase("Render tables"):
+        main_table.print(console)
+
+    # Display tables for each group showing group members, only if the group exists in the main permissions table
+    print('\n\nOnly the groups which has IAM Users attached to it are displayed.. Groups without IAM Users (Empty Groups) are not displayed\n')
+    for group_name, users in group_user_mapping.items():
+        if group_name in groups_with_permissions and users:  # Display only if group exists in main table
+            user_table = Table(show_header=True, header_style="bold #ff69b4")
+            user_table.add_column(Align(f"Users in '{group_name}' Group", align="center"), justify="left")
+            user_table = ReportTable(user_table, args.max_rows, summary_column=None)
+
+            for user in users:
+                user_table.add_row(user)
+
+            user_table.print(console)
+
+    # Option to save as CSV
+    export_to_csv = input("Would you like to export the output to a CSV file? (yes/no): ").strip().lower()
+    if export_to_csv == "yes":
+        with open("aws_iam.csv", mode="w", newline="") as file:
+            writer = csv.writer(file)
         
-        # Write main permissions table
-        writer.writerow(["Main Permissions Table"])
-        writer.writerow(["Name", "Policy Name", "Resource Type", "Policy Type", "Permission"])
-        writer.writerows(table_data)
+            # Write main permissions table
+            writer.writerow(["Main Permissions Table"])
+            writer.writerow(["Name", "Policy Name", "Resource Type", "Policy Type", "Permission"])
+            writer.writerows(iter_matching_permissions(data))
         
-        # Write users in group tables
-        for group_name, users in group_user_mapping.items():
-            if group_name in groups_with_permissions and users:
-                writer.writerow([])  # Blank line separator
-                writer.writerow([f"Users in Group '{group_name}' Table"])
-                writer.writerow(["User"])
-                for user in users:
-                    writer.writerow([user])
+            # Write users in group tables
+            for group_name, users in group_user_mapping.items():
+                if group_name in groups_with_permissions and users:
+                    writer.writerow([])  # Blank line separator
+                    writer.writerow([f"Users in Group '{group_name}' Table"])
+                    writer.writerow(["User"])
+                    for user in users:
+                        writer.writerow([user])
     
-    print("Output saved to 'aws_iam.csv'")
+        print("Output saved to 'aws_iam.csv'")
@@ -1,14 +1,35 @@
-import boto3
+import os
+import sys
+import asyncio
+import argparse
 from rich.console import Console
 from rich.table import Table
 import time
 from botocore.exceptions import ClientError
 
+# Make the shared aws_security_common package importable when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_security_common.clients import get_client, get_client_pool
+from aws_security_common.regions import RegionDiscovery, add_region_arguments
+from aws_security_common.async_calls import AsyncAwsCaller, add_async_arguments
+from aws_security_common.instrumentation import PROFILER, add_profile_arguments, enable_profiling
+from aws_security_common.checkpoints import CheckpointJournal, add_checkpoint_arguments
+from aws_security_common.output import add_output_arguments, report_table
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Check and enable encryption of SNS topics across regions')
+    add_region_arguments(parser)
+    add_async_arguments(parser)
+    add_profile_arguments(parser)
+    add_checkpoint_arguments(parser, '.aws_sns_checkpoint.jsonl')
+    add_output_arguments(parser)
+    return parser.parse_args()
+
 def validate_kms_key(kms_key_arn):
     try:
         # Extract region from the KMS key ARN
         region = kms_key_arn.split(':')[3]
-        kms_client = boto3.client('kms', region_name=region)
+        kms_client = get_client('kms', region)
         
         # Try to describe the key to verify it exists and is accessible
         response = kms_client.describe_key(KeyId=kms_key_arn)
@@ -38,9 +59,11 @@ def validate_kms_key(kms_key_arn):
         return False
 
 def get_sns_topics(region):
-    sns_client = boto3.client('sns', region_name=region)
-    response = sns_client.list_topics()
-    return response.get('Topics', [])
+    sns_client = get_client('sns', region)
+    topics = []
+    for page in sns_client.get_paginator('list_topics').paginate():
+        topics.extend(page.get('Topics', []))
+    return topics
 
 def check_topic_encryption(sns_client, topic_arn):
     attributes = sns_client.get_topic_attributes(TopicArn=topic_arn)['Attributes']
@@ -73,28 +96,74 @@ def encrypt_sns_topic(sns_client, topic_arn, kms_key_arn):
     except Exception as e:
         print(f'Error encrypting topic {topic_arn}: {str(e)}')
 
+# Checkpoint helpers: a region is one unit of work, stored as its topic ARNs and encryption statuses
+def record_region(journal, region, topics, encryption_statuses):
+    journal.record(("region", region), {"topics": [topic['TopicArn'] for topic in topics], "encryption": encryption_statuses})
+
+def load_region(journal, region):
+    result = journal.result(("region", region))
+    return [{'TopicArn': topic_arn} for topic_arn in result["topics"]], result["encryption"]
+
+async def fetch_topics_encryption_async(regions, max_concurrency, journal=None):
+    """List topics and read their encryption status for all regions concurrently on one event loop."""
+    async with AsyncAwsCaller(max_concurrency=max_concurrency) as aws:
+        async def fetch_region(region):
+            pages = await aws.paginate('sns', region, 'list_topics')
+            topics = [topic for page in pages for topic in page.get('Topics', [])]
+            responses = await asyncio.gather(*(aws.call('sns', region, 'get_topic_attributes', TopicArn=topic['TopicArn'])
+                                               for topic in topics))
+            encryption_statuses = [response['Attributes'].get('KmsMasterKeyId') for response in responses]
+            if journal:
+                record_region(journal, region, topics, encryption_statuses)
+            return topics, encryption_statuses
+
+        results = await asyncio.gather(*(fetch_region(region) for region in regions))
+        return dict(zip(regions, results))
+
 def main():
+    args = parse_arguments()
     console = Console()
+    enable_profiling(args.profile_report, console)
     table = Table(title="\nSNS Topics Encryption Status")
     table.add_column("Region", style="cyan", no_wrap=True)
     table.add_column("SNS Topic ARN", style="magenta", no_wrap=True, overflow="fold")
     table.add_column("Encryption Status", style="green")
+    # Renders at most --max-rows topics and streams every topic to --export
+    table = report_table(table, args)
     
-    regions = [region['RegionName'] for region in boto3.client('ec2').describe_regions()['Regions']]
+    with PROFILER.phase("Region discovery"):
+        discovery = RegionDiscovery(get_client_pool(), 'sns', ttl=args.region_cache_ttl, refresh=args.refresh_regions)
+        regions = discovery.regions(args.regions, args.skip_empty_regions)
     
     region_topics = {}
-    for region in regions:
-        sns_client = boto3.client('sns', region_name=region)
-        topics = get_sns_topics(region)
-        region_topics[region] = topics
-        
-        for topic in topics:
-            topic_arn = topic['TopicArn']
-            encryption_status = check_topic_encryption(sns_client, topic_arn)
-            encryption_status = encryption_status if encryption_status else "Not Encrypted"
-            table.add_row(region, topic_arn, encryption_status)
+    # Regions finished by an interrupted run are read back from the checkpoint journal
+    journal = CheckpointJournal(args.checkpoint, {"tool": "sns", "account": discovery.account_id}, resume=args.resume)
+    if journal.resumed:
+        console.print(f"[bold blue]Resuming: {journal.resumed} region(s) loaded from {args.checkpoint}[/bold blue]")
+    with PROFILER.phase("Topic enumeration"):
+        region_results = {region: load_region(journal, region) for region in regions if journal.done(("region", region))}
+        pending_regions = [region for region in regions if region not in region_results]
+        if args.use_async:
+            region_results.update(asyncio.run(fetch_topics_encryption_async(pending_regions, args.max_concurrency, journal)))
+        else:
+            for region in pending_regions:
+                sns_client = get_client('sns', region)
+                topics = get_sns_topics(region)
+                encryption_statuses = [check_topic_encryption(sns_client, topic['TopicArn']) for topic in topics]
+                record_region(journal, region, topics, encryption_statuses)
+                region_results[region] = topics, encryption_statuses
+
+        for region in regions:
+            topics, encryption_statuses = region_results[region]
+            region_topics[region] = topics
+            discovery.record(region, topics)
+            for topic, encryption_status in zip(topics, encryption_statuses):
+                table.add_row(region, topic['TopicArn'], encryption_status if encryption_status else "Not Encrypted")
+        discovery.save()
+        journal.complete()
     
-    console.print(table)
+    with PROFILER.phase("Render table"):
+        table.print(console)
     
     selected_regions = input("Enter the regions you want to process (comma-separated): ").split(',')
     
@@ -112,16 +181,18 @@ def main():
         region = region.strip()
         if region in region_topics:
             encrypt_all = input(f"\nDo you want to encrypt all SNS topics in {region}? (yes/no): ").strip().lower()
-            sns_client = boto3.client('sns', region_name=region)
+            sns_client = get_client('sns', region)
             
             if encrypt_all == 'yes':
-                for topic in region_topics[region]:
-                    encrypt_sns_topic(sns_client, topic['TopicArn'], kms_key_arn)
+                with PROFILER.phase("Encrypt topics"):
+                    for topic in region_topics[region]:
+                        encrypt_sns_topic(sns_client, topic['TopicArn'], kms_key_arn)
             else:
                 topic_count = int(input(f"How many SNS topics in {region} do you want to encrypt? "))
                 for _ in range(topic_count):
                     topic_name = input("Enter the SNS Topic ARN to encrypt: ")
-                    encrypt_sns_topic(sns_client, topic_name, kms_key_arn)
+                    with PROFILER.phase("Encrypt topics"):
+                        encrypt_sns_topic(sns_client, topic_name, kms_key_arn)
     
     # Show final encryption status
     console.print("\n[bold cyan]Final encryption status for processed regions:[/bold cyan]")
@@ -129,12 +200,13 @@ def main():
         region = region.strip()
         if region in region_topics:
             print(f"\nRegion: {region}")
-            sns_client = boto3.client('sns', region_name=region)
-            for topic in region_topics[region]:
-                topic_arn = topic['TopicArn']
-                encryption_status = check_topic_encryption(sns_client, topic_arn)
-                status = "Encrypted" if encryption_status else "Not Encrypted"
-                console.print(f"Topic: {topic_arn} - [bold cyan]{status}[/bold cyan]")
+            sns_client = get_client('sns', region)
+            with PROFILER.phase("Verify encryption"):
+                for topic in region_topics[region]:
+                    topic_arn = topic['TopicArn']
+                    encryption_status = check_topic_encryption(sns_client, topic_arn)
+                    status = "Encrypted" if encryption_status else "Not Encrypted"
+                    console.print(f"Topic: {topic_arn} - [bold cyan]{status}[/bold cyan]")
     
     more_regions = input("\nDo you want to process another region? (yes/no): ").strip().lower()
     if more_regions == 'yes':
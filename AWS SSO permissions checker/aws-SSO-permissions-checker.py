@@ -1,65 +1,134 @@
-import boto3
+import asyncio
 import csv
+import functools
+import json
+import os
+import sys
 import argparse
+from fnmatch import fnmatchcase
+from botocore.exceptions import ClientError
 from rich.console import Console
 from rich.table import Table
 from rich.align import Align
 
+# Make the shared aws_security_common package importable when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_security_common.clients import get_client_pool
+from aws_security_common.async_calls import AsyncAwsCaller, add_async_arguments
+from aws_security_common.instrumentation import PROFILER, add_profile_arguments, enable_profiling
+from aws_security_common.checkpoints import CheckpointJournal, add_checkpoint_arguments
+from aws_security_common.output import add_output_arguments, open_output, report_table
+
 # Initialize console for Rich output
 console = Console()
 
-# Parse command-line arguments
-parser = argparse.ArgumentParser(description="AWS Identity Center Data Fetcher")
-parser.add_argument("--profile", type=str, help="AWS CLI profile name", default=None)
-parser.add_argument("--region", type=str, help="AWS region", default=None)
-args = parser.parse_args()
-
-# Create a session based on profile and region options
-if args.profile and args.region:
-    session = boto3.Session(profile_name=args.profile, region_name=args.region)
-elif args.profile:
-    session = boto3.Session(profile_name=args.profile)
-elif args.region:
-    session = boto3.Session(region_name=args.region)
-else:
-    session = boto3.Session()
-
-# Initialize AWS clients with the session
-sso_admin_client = session.client('sso-admin')
-identity_store_client = session.client('identitystore')
+# Parse command-line arguments (defaults only when imported by another tool)
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="AWS Identity Center Data Fetcher")
+    parser.add_argument("--profile", type=str, help="AWS CLI profile name", default=None)
+    parser.add_argument("--region", type=str, help="AWS region", default=None)
+    parser.add_argument("--query-user", type=str, help="Show effective access for an Identity Center user name", default=None)
+    parser.add_argument("--query-account", type=str, help="Show every user with effective access to an account ID", default=None)
+    parser.add_argument("--query-permission-set", type=str, help="Show every user granted a permission set name", default=None)
+    parser.add_argument("--query-policy", type=str, help="Show every user reaching a managed policy name or ARN", default=None)
+    parser.add_argument("--search-actions", type=str, help="Comma-separated IAM actions to search for across permission sets (e.g. secretsmanager:GetSecretValue,iam:*)", default=None)
+    parser.add_argument("--policy-cache", type=str, help="Path of the managed policy document cache", default=".aws_sso_policy_cache.json")
+    parser.add_argument("--policy-role", type=str, help="Role name assumed in each member account to read customer managed policies (e.g. OrganizationAccountAccessRole)", default=None)
+    add_async_arguments(parser)
+    add_profile_arguments(parser)
+    add_checkpoint_arguments(parser, ".aws_sso_checkpoint.jsonl")
+    add_output_arguments(parser)
+    return parser.parse_args(argv)
+
+args = parse_arguments(None if __name__ == "__main__" else [])
+
+# Initialize AWS clients from the shared client pool based on profile and region options
+def init_clients(profile=None, region=None):
+    global clients, sso_admin_client, identity_store_client
+    clients = get_client_pool(profile, region)
+    sso_admin_client = clients.get('sso-admin')
+    identity_store_client = clients.get('identitystore')
+
+init_clients(args.profile, args.region)
 
 # Set up the instance and identity store IDs
 INSTANCE_ARN = "arn:aws:sso:::instance/ssoins-7223da93bb899906"
 IDENTITY_STORE_ID = "d-9067b222fc"
 
-# Fetch available accounts and permission sets with pagination
-def get_available_accounts():
-    accounts = []
+# Fetch all permission sets with pagination
+def list_permission_sets():
     permission_sets = []
-
     paginator = sso_admin_client.get_paginator('list_permission_sets')
     for page in paginator.paginate(InstanceArn=INSTANCE_ARN):
         permission_sets.extend(page['PermissionSets'])
+    return permission_sets
+
+# Fetch the accounts a permission set is provisioned to with pagination
+def list_provisioned_accounts(permission_set_arn):
+    account_ids = []
+    paginator = sso_admin_client.get_paginator('list_accounts_for_provisioned_permission_set')
+    for page in paginator.paginate(InstanceArn=INSTANCE_ARN, PermissionSetArn=permission_set_arn):
+        account_ids.extend(page['AccountIds'])
+    return account_ids
+
+# Fetch the assignments of a permission set in one account with pagination
+def list_account_assignments(account_id, permission_set_arn):
+    assignments = []
+    paginator = sso_admin_client.get_paginator('list_account_assignments')
+    for page in paginator.paginate(InstanceArn=INSTANCE_ARN, AccountId=account_id, PermissionSetArn=permission_set_arn):
+        assignments.extend(page['AccountAssignments'])
+    return assignments
+
+# User and group names by (type, ID), resolved once per run
+principal_names = {}
+
+# Resolve the display name of a user or group assignment principal
+def get_principal_name(principal_type, principal_id):
+    key = (principal_type, principal_id)
+    if key not in principal_names:
+        if principal_type == "USER":
+            principal_names[key] = identity_store_client.describe_user(
+                IdentityStoreId=IDENTITY_STORE_ID,
+                UserId=principal_id
+            )['UserName']
+        elif principal_type == "GROUP":
+            principal_names[key] = identity_store_client.describe_group(
+                IdentityStoreId=IDENTITY_STORE_ID,
+                GroupId=principal_id
+            )['DisplayName']
+        else:
+            principal_names[key] = None
+    return principal_names[key]
+
+# Fetch available accounts and permission sets with pagination
+def get_available_accounts():
+    accounts = []
+    permission_sets = list_permission_sets()
 
     for permission_set_arn in permission_sets:
-        account_ids = sso_admin_client.list_accounts_for_provisioned_permission_set(
-            InstanceArn=INSTANCE_ARN,
-            PermissionSetArn=permission_set_arn
-        )['AccountIds']
+        account_ids = list_provisioned_accounts(permission_set_arn)
 
         for account_id in account_ids:
             if account_id not in [acc["ID"] for acc in accounts]:  # Avoid duplicates
-                account_name = session.client("organizations").describe_account(AccountId=account_id)['Account']['Name']
+                account_name = clients.get("organizations").describe_account(AccountId=account_id)['Account']['Name']
                 accounts.append({"ID": account_id, "Name": account_name})
 
     return accounts, permission_sets
 
 # Fetch data for permission sets across all accounts (Script 1 functionality)
-def fetch_permission_set_data_all(permission_sets):
+def fetch_permission_set_data_all(permission_sets, journal=None):
     assignments_data = []
     policies_data = []
 
     for permission_set_arn in permission_sets:
+        # Permission sets finished by an interrupted run come from the checkpoint journal
+        if journal and journal.done(("permission-set", permission_set_arn)):
+            result = journal.result(("permission-set", permission_set_arn))
+            assignments_data.extend(result["assignments"])
+            policies_data.append(result["policy"])
+            continue
+
+        permission_set_assignments = []
         permission_set_name = sso_admin_client.describe_permission_set(
             InstanceArn=INSTANCE_ARN,
             PermissionSetArn=permission_set_arn
@@ -70,12 +139,14 @@ def fetch_permission_set_data_all(permission_sets):
             PermissionSetArn=permission_set_arn
         )
         aws_managed_policies = [policy['Name'] for policy in aws_managed_policies_response.get('AttachedManagedPolicies', [])]
+        aws_managed_policy_arns = [policy['Arn'] for policy in aws_managed_policies_response.get('AttachedManagedPolicies', [])]
 
         customer_managed_policies_response = sso_admin_client.list_customer_managed_policy_references_in_permission_set(
             InstanceArn=INSTANCE_ARN,
             PermissionSetArn=permission_set_arn
         )
         customer_managed_policies = [policy['Name'] for policy in customer_managed_policies_response.get('CustomerManagedPolicyReferences', [])]
+        customer_managed_policy_refs = customer_managed_policies_response.get('CustomerManagedPolicyReferences', [])
 
         inline_policy_response = sso_admin_client.get_inline_policy_for_permission_set(
             InstanceArn=INSTANCE_ARN,
@@ -83,90 +154,145 @@ def fetch_permission_set_data_all(permission_sets):
         )
         inline_policy = inline_policy_response.get('InlinePolicy', "None")
 
-        account_ids = sso_admin_client.list_accounts_for_provisioned_permission_set(
-            InstanceArn=INSTANCE_ARN,
-            PermissionSetArn=permission_set_arn
-        )['AccountIds']
+        account_ids = list_provisioned_accounts(permission_set_arn)
 
         for account_id in account_ids:
-            assignments = sso_admin_client.list_account_assignments(
-                InstanceArn=INSTANCE_ARN,
-                AccountId=account_id,
-                PermissionSetArn=permission_set_arn
-            )['AccountAssignments']
+            assignments = list_account_assignments(account_id, permission_set_arn)
 
             for assignment in assignments:
                 principal_type = assignment['PrincipalType']
                 principal_id = assignment['PrincipalId']
-                principal_name = None
-
-                if principal_type == "USER":
-                    principal_name = identity_store_client.describe_user(
-                        IdentityStoreId=IDENTITY_STORE_ID,
-                        UserId=principal_id
-                    )['UserName']
-                elif principal_type == "GROUP":
-                    principal_name = identity_store_client.describe_group(
-                        IdentityStoreId=IDENTITY_STORE_ID,
-                        GroupId=principal_id
-                    )['DisplayName']
-
-                assignments_data.append({
+
+                permission_set_assignments.append({
                     "Type": principal_type,
-                    "Name": principal_name,
+                    "Principal ID": principal_id,
+                    "Name": get_principal_name(principal_type, principal_id),
                     "Permission Set": permission_set_name,
                     "Account ID": account_id
                 })
 
-        policies_data.append({
+        policy = {
             "Permission Set": permission_set_name,
             "AWS Managed Policies": aws_managed_policies if aws_managed_policies else ["None"],
             "Customer Managed Policies": customer_managed_policies if customer_managed_policies else ["None"],
-            "Inline Policy": inline_policy if inline_policy else "None"
-        })
+            "Inline Policy": inline_policy if inline_policy else "None",
+            "AWS Managed Policy ARNs": aws_managed_policy_arns,
+            "Customer Managed Policy References": customer_managed_policy_refs,
+            "Account IDs": account_ids
+        }
+        assignments_data.extend(permission_set_assignments)
+        policies_data.append(policy)
+        if journal:
+            journal.record(("permission-set", permission_set_arn), {"assignments": permission_set_assignments, "policy": policy})
+
+    assignments_data = sorted(assignments_data, key=lambda x: (x["Type"] != "USER", x["Type"]))
+    return assignments_data, policies_data
 
+# Async variant of fetch_permission_set_data_all: lookups run concurrently and each principal is resolved once
+async def fetch_permission_set_data_all_async(permission_sets, max_concurrency, journal=None):
+    async with AsyncAwsCaller(args.profile, args.region, max_concurrency) as aws:
+        principal_tasks = {}  # (type, id) -> task resolving the user or group name, shared by all permission sets
+
+        async def resolve_principal(principal_type, principal_id):
+            if principal_type == "USER":
+                response = await aws.call('identitystore', None, 'describe_user', IdentityStoreId=IDENTITY_STORE_ID, UserId=principal_id)
+                return response['UserName']
+            if principal_type == "GROUP":
+                response = await aws.call('identitystore', None, 'describe_group', IdentityStoreId=IDENTITY_STORE_ID, GroupId=principal_id)
+                return response['DisplayName']
+            return None
+
+        def principal_name(principal_type, principal_id):
+            key = (principal_type, principal_id)
+            if key not in principal_tasks:
+                principal_tasks[key] = asyncio.ensure_future(resolve_principal(principal_type, principal_id))
+            return principal_tasks[key]
+
+        async def fetch_permission_set(permission_set_arn):
+            # Permission sets finished by an interrupted run come from the checkpoint journal
+            if journal and journal.done(("permission-set", permission_set_arn)):
+                result = journal.result(("permission-set", permission_set_arn))
+                return result["policy"], result["assignments"]
+
+            described, managed, customer_managed, inline, account_pages = await asyncio.gather(
+                aws.call('sso-admin', None, 'describe_permission_set', InstanceArn=INSTANCE_ARN, PermissionSetArn=permission_set_arn),
+                aws.call('sso-admin', None, 'list_managed_policies_in_permission_set', InstanceArn=INSTANCE_ARN, PermissionSetArn=permission_set_arn),
+                aws.call('sso-admin', None, 'list_customer_managed_policy_references_in_permission_set', InstanceArn=INSTANCE_ARN, PermissionSetArn=permission_set_arn),
+                aws.call('sso-admin', None, 'get_inline_policy_for_permission_set', InstanceArn=INSTANCE_ARN, PermissionSetArn=permission_set_arn),
+                aws.paginate('sso-admin', None, 'list_accounts_for_provisioned_permission_set', InstanceArn=INSTANCE_ARN, PermissionSetArn=permission_set_arn),
+            )
+            account_ids = [account_id for page in account_pages for account_id in page['AccountIds']]
+            assignment_pages = await asyncio.gather(*(
+                aws.paginate('sso-admin', None, 'list_account_assignments', InstanceArn=INSTANCE_ARN, AccountId=account_id, PermissionSetArn=permission_set_arn)
+                for account_id in account_ids))
+            assignments = [assignment for pages in assignment_pages for page in pages for assignment in page['AccountAssignments']]
+            names = await asyncio.gather(*(principal_name(assignment['PrincipalType'], assignment['PrincipalId']) for assignment in assignments))
+
+            aws_managed_policies = [policy['Name'] for policy in managed.get('AttachedManagedPolicies', [])]
+            customer_managed_policies = [policy['Name'] for policy in customer_managed.get('CustomerManagedPolicyReferences', [])]
+            inline_policy = inline.get('InlinePolicy', "None")
+            policy = {
+                "Permission Set": described['PermissionSet']['Name'],
+                "AWS Managed Policies": aws_managed_policies if aws_managed_policies else ["None"],
+                "Customer Managed Policies": customer_managed_policies if customer_managed_policies else ["None"],
+                "Inline Policy": inline_policy if inline_policy else "None",
+                "AWS Managed Policy ARNs": [policy['Arn'] for policy in managed.get('AttachedManagedPolicies', [])],
+                "Customer Managed Policy References": customer_managed.get('CustomerManagedPolicyReferences', []),
+                "Account IDs": account_ids
+            }
+            permission_set_assignments = [{
+                "Type": assignment['PrincipalType'],
+                "Principal ID": assignment['PrincipalId'],
+                "Name": name,
+                "Permission Set": policy["Permission Set"],
+                "Account ID": assignment['AccountId']
+            } for assignment, name in zip(assignments, names)]
+            if journal:
+                journal.record(("permission-set", permission_set_arn), {"assignments": permission_set_assignments, "policy": policy})
+            return policy, permission_set_assignments
+
+        results = await asyncio.gather(*(fetch_permission_set(permission_set_arn) for permission_set_arn in permission_sets))
+
+    assignments_data = [assignment for policy, assignments in results for assignment in assignments]
+    policies_data = [policy for policy, assignments in results]
     assignments_data = sorted(assignments_data, key=lambda x: (x["Type"] != "USER", x["Type"]))
     return assignments_data, policies_data
 
 # Fetch data for permission sets for a specific account (Script 2 functionality)
-def fetch_permission_set_data(account_id, permission_sets):
+def fetch_permission_set_data(account_id, permission_sets, journal=None):
     assignments_data = []
     policies_data = []
     assigned_permission_sets = set()  # Track permission sets assigned to the selected account
 
     for permission_set_arn in permission_sets:
+        # Permission sets finished by an interrupted run come from the checkpoint journal
+        unit = ("account-permission-set", account_id, permission_set_arn)
+        if journal and journal.done(unit):
+            result = journal.result(unit)
+            assignments_data.extend(result["assignments"])
+            if result["policy"]:
+                policies_data.append(result["policy"])
+            continue
+
+        permission_set_assignments = []
+        policy = None
         permission_set_name = sso_admin_client.describe_permission_set(
             InstanceArn=INSTANCE_ARN,
             PermissionSetArn=permission_set_arn
         )['PermissionSet']['Name']
 
-        assignments = sso_admin_client.list_account_assignments(
-            InstanceArn=INSTANCE_ARN,
-            AccountId=account_id,
-            PermissionSetArn=permission_set_arn
-        )['AccountAssignments']
+        assignments = list_account_assignments(account_id, permission_set_arn)
 
         if assignments:
             assigned_permission_sets.add(permission_set_arn)
             for assignment in assignments:
                 principal_type = assignment['PrincipalType']
                 principal_id = assignment['PrincipalId']
-                principal_name = None
-
-                if principal_type == "USER":
-                    principal_name = identity_store_client.describe_user(
-                        IdentityStoreId=IDENTITY_STORE_ID,
-                        UserId=principal_id
-                    )['UserName']
-                elif principal_type == "GROUP":
-                    principal_name = identity_store_client.describe_group(
-                        IdentityStoreId=IDENTITY_STORE_ID,
-                        GroupId=principal_id
-                    )['DisplayName']
-
-                assignments_data.append({
+
+                permission_set_assignments.append({
                     "Type": principal_type,
-                    "Name": principal_name,
+                    "Principal ID": principal_id,
+                    "Name": get_principal_name(principal_type, principal_id),
                     "Permission Set": permission_set_name,
                     "Account ID": account_id
                 })
@@ -177,12 +303,14 @@ def fetch_permission_set_data(account_id, permission_sets):
                 PermissionSetArn=permission_set_arn
             )
             aws_managed_policies = [policy['Name'] for policy in aws_managed_policies_response.get('AttachedManagedPolicies', [])]
+            aws_managed_policy_arns = [policy['Arn'] for policy in aws_managed_policies_response.get('AttachedManagedPolicies', [])]
 
             customer_managed_policies_response = sso_admin_client.list_customer_managed_policy_references_in_permission_set(
                 InstanceArn=INSTANCE_ARN,
                 PermissionSetArn=permission_set_arn
             )
             customer_managed_policies = [policy['Name'] for policy in customer_managed_policies_response.get('CustomerManagedPolicyReferences', [])]
+            customer_managed_policy_refs = customer_managed_policies_response.get('CustomerManagedPolicyReferences', [])
 
             inline_policy_response = sso_admin_client.get_inline_policy_for_permission_set(
                 InstanceArn=INSTANCE_ARN,
@@ -190,15 +318,30 @@ def fetch_permission_set_data(account_id, permission_sets):
             )
             inline_policy = inline_policy_response.get('InlinePolicy', "None")
 
-            policies_data.append({
+            policy = {
                 "Permission Set": permission_set_name,
                 "AWS Managed Policies": aws_managed_policies if aws_managed_policies else ["None"],
                 "Customer Managed Policies": customer_managed_policies if customer_managed_policies else ["None"],
-                "Inline Policy": inline_policy if inline_policy else "None"
-            })
+                "Inline Policy": inline_policy if inline_policy else "None",
+                "AWS Managed Policy ARNs": aws_managed_policy_arns,
+                "Customer Managed Policy References": customer_managed_policy_refs,
+                "Account IDs": [account_id]
+            }
+            policies_data.append(policy)
+
+        assignments_data.extend(permission_set_assignments)
+        if journal:
+            journal.record(unit, {"assignments": permission_set_assignments, "policy": policy})
 
     return assignments_data, policies_data
 
+# Open the checkpoint journal of this Identity Center instance, reloading completed permission sets with --resume
+def open_checkpoint_journal():
+    journal = CheckpointJournal(args.checkpoint, {"tool": "sso", "instance": INSTANCE_ARN}, resume=args.resume)
+    if journal.resumed:
+        console.print(f"[bold blue]Resuming: {journal.resumed} completed permission set(s) loaded from {args.checkpoint}[/bold blue]")
+    return journal
+
 # Display tables with assignment data and policies
 def display_tables(assignments_data, policies_data, user_group_map):
     # Assignments table
@@ -207,6 +350,7 @@ def display_tables(assignments_data, policies_data, user_group_map):
     assignment_table.add_column(Align("User/Group Name",align="center"), style="green", justify="left")
     assignment_table.add_column(Align("Permission Set",align="center"), style="yellow", justify="left")
     assignment_table.add_column(Align("Account ID",align="center"), style="blue", justify="left")
+    assignment_table = report_table(assignment_table, args, "assignments", summary_column=3)
 
     for assignment in assignments_data:
         assignment_table.add_row(
@@ -215,7 +359,7 @@ def display_tables(assignments_data, policies_data, user_group_map):
             assignment["Permission Set"],
             assignment["Account ID"]
         )
-    console.print(assignment_table)
+    assignment_table.print(console)
 
     # Policies table
     policy_table = Table(title="Policies Attached to Permission Sets", header_style="bold white",title_style="bold #ab79d5")
@@ -223,6 +367,7 @@ def display_tables(assignments_data, policies_data, user_group_map):
     policy_table.add_column(Align("AWS Managed Policies",align="center"), style="green", justify="left")
     policy_table.add_column(Align("Customer Managed Policies",align="center"), style="yellow", justify="left")
     policy_table.add_column(Align("Inline Policy",align="center"), style="blue", justify="left")
+    policy_table = report_table(policy_table, args, "policies", summary_column=None)
 
     for policy in policies_data:
         policy_table.add_row(
@@ -231,50 +376,417 @@ def display_tables(assignments_data, policies_data, user_group_map):
             "\n".join(policy["Customer Managed Policies"]),
             policy["Inline Policy"]
         )
-    console.print("\n",policy_table)
+    policy_table.print(console, "\n")
 
     # User-Group Memberships table
     user_group_table = Table(title="User-Group Memberships", header_style="bold white",title_style="bold #ab79d5")
     user_group_table.add_column(Align("User Name",align="center"), style="white", justify="left")
     user_group_table.add_column(Align("Groups",align="center"), style="green", justify="left")
+    user_group_table = report_table(user_group_table, args, "user-groups", summary_column=None)
 
-    for user_name, groups in user_group_map.items():
-        user_group_table.add_row(user_name, ", ".join(groups))
-    console.print("\n",user_group_table)
+    for user in sorted(user_group_map.values(), key=lambda user: user["User Name"]):
+        user_group_table.add_row(user["User Name"], ", ".join(sorted(user["Groups"].values())))
+    user_group_table.print(console, "\n")
 
-# Fetch user-group memberships based on assignments
+# Fetch user-group memberships based on assignments, keyed by user ID: {"User Name": name, "Groups": {group ID: group name}}
 def fetch_user_group_memberships(assignments_data=None):
     user_group_map = {}
-    assigned_groups = {assignment["Name"] for assignment in assignments_data if assignment["Type"] == "GROUP"} if assignments_data else None
+    assigned_groups = {assignment["Principal ID"] for assignment in assignments_data if assignment["Type"] == "GROUP"} if assignments_data else None
+
+    for groups_page in identity_store_client.get_paginator('list_groups').paginate(IdentityStoreId=IDENTITY_STORE_ID):
+        for group in groups_page['Groups']:
+            group_id = group['GroupId']
+            group_name = group['DisplayName']
+            principal_names[("GROUP", group_id)] = group_name
+
+            if assigned_groups is not None and group_id not in assigned_groups:
+                continue
+
+            for members_page in identity_store_client.get_paginator('list_group_memberships').paginate(
+                    IdentityStoreId=IDENTITY_STORE_ID, GroupId=group_id):
+                for member in members_page['GroupMemberships']:
+                    user_id = member['MemberId'].get('UserId')
+                    if not user_id:
+                        continue
+                    user = user_group_map.setdefault(user_id, {"User Name": get_principal_name("USER", user_id), "Groups": {}})
+                    user["Groups"][group_id] = group_name
 
-    for group in identity_store_client.list_groups(IdentityStoreId=IDENTITY_STORE_ID)['Groups']:
-        group_id = group['GroupId']
-        group_name = group['DisplayName']
-        
-        if assigned_groups and group_name not in assigned_groups:
-            continue
+    return user_group_map
 
-        members_response = identity_store_client.list_group_memberships(
-            IdentityStoreId=IDENTITY_STORE_ID,
-            GroupId=group_id
-        )['GroupMemberships']
+# In-memory access graph (principal <-> permission set <-> account <-> user) built once per run.
+# Principals are keyed by their identity store ID and policies by ARN; names are only attributes for display.
+class AccessGraph:
+    def __init__(self, assignments_data, policies_data, user_group_map):
+        # Forward indexes
+        self.principal_grants = {}   # (type, principal id) -> {(permission set, account id)}
+        self.principal_names = {}    # (type, principal id) -> user or group name
+        self.user_groups = {}        # user id -> {group id}
+        self.permission_set_policies = {}  # permission set -> {managed policy ARN}
+
+        # Reverse indexes
+        self.group_users = {}        # group id -> {user id}
+        self.user_ids = {}           # user name -> {user id}
+        self.policy_grants = {}      # managed policy ARN -> {(permission set, account id or None for every account)}
+        self.policy_names = {}       # managed policy ARN -> policy name
+
+        # Effective user access rows and their lookup indexes
+        self.effective_access = []   # (user, account id, permission set, via)
+        self.by_user = {}            # user id -> rows
+        self.by_account = {}
+        self.by_permission_set = {}
 
-        for member in members_response:
-            user_id = member['MemberId']['UserId']
-            user_name = identity_store_client.describe_user(
-                IdentityStoreId=IDENTITY_STORE_ID,
-                UserId=user_id
-            )['UserName']
-            
-            if user_name not in user_group_map:
-                user_group_map[user_name] = []
-            user_group_map[user_name].append(group_name)
+        for assignment in assignments_data:
+            key = (assignment["Type"], assignment["Principal ID"])
+            self.principal_names[key] = assignment["Name"]
+            self.principal_grants.setdefault(key, set()).add((assignment["Permission Set"], assignment["Account ID"]))
 
-    return user_group_map
+        for user_id, user in user_group_map.items():
+            self.principal_names[("USER", user_id)] = user["User Name"]
+            for group_id, group_name in user["Groups"].items():
+                self.principal_names.setdefault(("GROUP", group_id), group_name)
+                self.user_groups.setdefault(user_id, set()).add(group_id)
+                self.group_users.setdefault(group_id, set()).add(user_id)
+
+        for (principal_type, principal_id), name in self.principal_names.items():
+            if principal_type == "USER":
+                self.user_ids.setdefault(name, set()).add(principal_id)
+
+        for policy in policies_data:
+            permission_set = policy["Permission Set"]
+            arns = self.permission_set_policies.setdefault(permission_set, set())
+            # AWS managed policies have one ARN in every account
+            for policy_arn in policy["AWS Managed Policy ARNs"]:
+                self._add_policy(arns, policy_arn, permission_set, None)
+            # A customer managed policy reference resolves to a policy in each account the permission set is provisioned to
+            for reference in policy["Customer Managed Policy References"]:
+                for account_id in policy["Account IDs"]:
+                    policy_arn = f"arn:aws:iam::{account_id}:policy{reference.get('Path', '/')}{reference['Name']}"
+                    self._add_policy(arns, policy_arn, permission_set, account_id)
+
+        self._resolve_effective_access()
+
+    def _add_policy(self, arns, policy_arn, permission_set, account_id):
+        arns.add(policy_arn)
+        self.policy_names[policy_arn] = policy_arn.rsplit("/", 1)[-1]
+        self.policy_grants.setdefault(policy_arn, set()).add((permission_set, account_id))
+
+    # Expand group grants onto their member users so every row is a concrete user
+    def _resolve_effective_access(self):
+        seen = set()
+        for (principal_type, principal_id), grants in self.principal_grants.items():
+            if principal_type == "USER":
+                users = [(principal_id, "Direct")]
+            elif principal_type == "GROUP":
+                via = f"Group: {self.principal_names[(principal_type, principal_id)]}"
+                users = [(user_id, via) for user_id in sorted(self.group_users.get(principal_id, ()))]
+            else:
+                continue
+
+            for user_id, via in users:
+                user_name = self.principal_names.get(("USER", user_id), user_id)
+                for permission_set, account_id in grants:
+                    if (user_id, account_id, permission_set, via) in seen:
+                        continue
+                    seen.add((user_id, account_id, permission_set, via))
+                    row = (user_name, account_id, permission_set, via)
+                    self.effective_access.append(row)
+                    self.by_user.setdefault(user_id, []).append(row)
+                    self.by_account.setdefault(account_id, []).append(row)
+                    self.by_permission_set.setdefault(permission_set, []).append(row)
+
+        self.effective_access.sort()
+
+    def access_for_user(self, user_name):
+        rows = []
+        for user_id in self.user_ids.get(user_name, ()):
+            rows.extend(self.by_user.get(user_id, []))
+        return sorted(rows)
+
+    def access_for_account(self, account_id):
+        return sorted(self.by_account.get(account_id, []))
+
+    def access_for_permission_set(self, permission_set):
+        return sorted(self.by_permission_set.get(permission_set, []))
+
+    # Policies matching a name or ARN, as tuples of ARNs: one per AWS managed policy,
+    # and one per customer managed policy reference holding its ARN in each account
+    def find_policies(self, name_or_arn):
+        if name_or_arn in self.policy_grants:
+            return [(name_or_arn,)]
+        aws_managed = []
+        customer_managed = {}
+        for policy_arn, name in sorted(self.policy_names.items()):
+            if name != name_or_arn:
+                continue
+            if policy_arn.startswith("arn:aws:iam::aws:"):
+                aws_managed.append((policy_arn,))
+            else:
+                customer_managed.setdefault(policy_arn.split(":policy", 1)[1], []).append(policy_arn)
+        return aws_managed + [tuple(arns) for path, arns in sorted(customer_managed.items())]
+
+    def access_for_policy(self, policy_arns):
+        rows = set()
+        for policy_arn in policy_arns:
+            for permission_set, account_id in self.policy_grants.get(policy_arn, ()):
+                rows.update(row for row in self.by_permission_set.get(permission_set, [])
+                            if account_id is None or row[1] == account_id)
+        return sorted(rows)
+
+    def policy_label(self, policy_arns):
+        if policy_arns[0].startswith("arn:aws:iam::aws:"):
+            return f"AWS Managed Policy '{policy_arns[0]}'"
+        if len(policy_arns) == 1:
+            return f"Customer Managed Policy '{policy_arns[0]}'"
+        return f"Customer Managed Policy '{policy_arns[0].split(':policy', 1)[1]}' ({len(policy_arns)} accounts)"
+
+    def policy_slug(self, policy_arns):
+        kind = "aws" if policy_arns[0].startswith("arn:aws:iam::aws:") else "customer"
+        return f"{kind}-{self.policy_names[policy_arns[0]]}"
+
+# Display effective user access rows as a table
+def display_effective_access(rows, title="Effective User Access", name="effective-access"):
+    access_table = Table(title=title, header_style="bold white", title_style="bold #ab79d5")
+    access_table.add_column(Align("User Name", align="center"), style="white", justify="left")
+    access_table.add_column(Align("Account ID", align="center"), style="blue", justify="left")
+    access_table.add_column(Align("Permission Set", align="center"), style="yellow", justify="left")
+    access_table.add_column(Align("Granted Via", align="center"), style="green", justify="left")
+    access_table = report_table(access_table, args, name, summary_column=1)
+
+    for row in rows:
+        access_table.add_row(*row)
+    access_table.print(console, "\n")
+
+# Answer the --query-* options from the access graph
+def run_access_queries(access_graph):
+    if args.query_user:
+        display_effective_access(access_graph.access_for_user(args.query_user), f"Effective Access for User '{args.query_user}'", "query-user")
+    if args.query_account:
+        display_effective_access(access_graph.access_for_account(args.query_account), f"Users with Access to Account {args.query_account}", "query-account")
+    if args.query_permission_set:
+        display_effective_access(access_graph.access_for_permission_set(args.query_permission_set), f"Users Granted Permission Set '{args.query_permission_set}'", "query-permission-set")
+    if args.query_policy:
+        # A name can match both an AWS managed and a customer managed policy; each gets its own table
+        policies = access_graph.find_policies(args.query_policy)
+        if not policies:
+            display_effective_access([], f"Users Reaching Managed Policy '{args.query_policy}'", "query-policy")
+        for policy in policies:
+            display_effective_access(access_graph.access_for_policy(policy), f"Users Reaching {access_graph.policy_label(policy)}",
+                                     "query-policy" if len(policies) == 1 else f"query-policy-{access_graph.policy_slug(policy)}")
+
+# Load the managed policy document cache shared across runs, keyed by "<policy arn>|<policy id>|<version id>"
+# (the policy ID tells a deleted and recreated policy, whose versions restart at v1, from the original)
+def load_policy_cache(cache_path):
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        console.print(f"[bold yellow]Ignoring unreadable policy cache {cache_path}[/bold yellow]")
+        return {}
+
+def save_policy_cache(policy_cache, cache_path):
+    with open(cache_path, mode="w") as file:
+        json.dump(policy_cache, file)
+
+# Resolve a managed policy document once per unique policy ARN and default version.
+# Returns None when it cannot be read; the reason is kept in unresolved_policies.
+def get_managed_policy_document(iam_client, policy_arn, policy_cache, version_ids, unresolved_policies):
+    if policy_arn not in version_ids:
+        try:
+            policy = iam_client.get_policy(PolicyArn=policy_arn)['Policy']
+            version_ids[policy_arn] = f"{policy['PolicyId']}|{policy['DefaultVersionId']}"  # "<policy id>|<version id>"
+        except ClientError as e:
+            version_ids[policy_arn] = None  # Remember the failure so it is not retried for every permission set
+            unresolved_policies.setdefault(policy_arn, {"Reason": e.response['Error']['Code'], "Permission Sets": set()})
+    if version_ids[policy_arn] is None:
+        return None
+
+    cache_key = f"{policy_arn}|{version_ids[policy_arn]}"
+    if cache_key not in policy_cache:
+        version_id = version_ids[policy_arn].rsplit("|", 1)[1]
+        try:
+            document = iam_client.get_policy_version(PolicyArn=policy_arn, VersionId=version_id)['PolicyVersion']['Document']
+        except ClientError as e:
+            version_ids[policy_arn] = None
+            unresolved_policies.setdefault(policy_arn, {"Reason": e.response['Error']['Code'], "Permission Sets": set()})
+            return None
+        policy_cache[cache_key] = json.loads(document) if isinstance(document, str) else document
+    return policy_cache[cache_key]
+
+# Account ID of the profile's credentials, looked up once
+@functools.lru_cache(maxsize=None)
+def get_caller_account():
+    return clients.get("sts").get_caller_identity()['Account']
+
+# IAM client able to read customer managed policies in an account: the profile's own account directly,
+# member accounts through --policy-role. Returns (client, None) or (None, reason).
+def get_account_iam_client(account_id, account_clients):
+    if account_id not in account_clients:
+        if account_id == get_caller_account():
+            account_clients[account_id] = (clients.get("iam"), None)
+        elif not args.policy_role:
+            account_clients[account_id] = (None, "Member account; pass --policy-role to read it")
+        else:
+            role_arn = f"arn:aws:iam::{account_id}:role/{args.policy_role}"
+            try:
+                account_clients[account_id] = (clients.assume_role(role_arn, "aws-sso-permissions-checker").get("iam"), None)
+            except ClientError as e:
+                account_clients[account_id] = (None, f"Cannot assume {role_arn}: {e.response['Error']['Code']}")
+    return account_clients[account_id]
+
+# Check if a policy action pattern covers a searched action (wildcards allowed on either side)
+def action_matches(policy_action, searched_action):
+    policy_action = policy_action.lower()
+    searched_action = searched_action.lower()
+    return fnmatchcase(searched_action, policy_action) or fnmatchcase(policy_action, searched_action)
+
+# Return (searched action, granting action) pairs allowed by a policy document
+def match_policy_actions(policy_document, searched_actions):
+    matches = []
+    statements = policy_document.get("Statement", [])
+    if isinstance(statements, dict):
+        statements = [statements]
+
+    for statement in statements:
+        if statement.get("Effect") != "Allow":
+            continue
+        if "Action" in statement:
+            actions = statement["Action"]
+            if isinstance(actions, str):
+                actions = [actions]
+            for searched_action in searched_actions:
+                for action in actions:
+                    if action_matches(action, searched_action) and (searched_action, action) not in matches:
+                        matches.append((searched_action, action))
+        elif "NotAction" in statement:
+            not_actions = statement["NotAction"]
+            if isinstance(not_actions, str):
+                not_actions = [not_actions]
+            granted_by = "NotAction: " + ", ".join(not_actions)
+            for searched_action in searched_actions:
+                if not any(action_matches(action, searched_action) for action in not_actions) and (searched_action, granted_by) not in matches:
+                    matches.append((searched_action, granted_by))
+    return matches
+
+# Search every permission set for the requested actions and yield them per assigned principal and account,
+# as each permission set is searched
+def iter_action_matches(policies_data, assignments_data, searched_actions, cache_path, show_unresolved=True):
+    iam_client = clients.get("iam")
+    policy_cache = load_policy_cache(cache_path)
+    version_ids = {}
+    account_clients = {}
+    unresolved_policies = {}  # policy ARN -> {"Reason": ..., "Permission Sets": {...}}
+
+    assignments_by_permission_set = {}
+    for assignment in assignments_data:
+        assignments_by_permission_set.setdefault(assignment["Permission Set"], []).append(assignment)
+
+    for policy in policies_data:
+        permission_set_name = policy["Permission Set"]
+        assignments = assignments_by_permission_set.get(permission_set_name)
+        if not assignments:
+            continue
+
+        # Matches that apply to every account the permission set is provisioned to
+        permission_set_matches = []
+        inline_policy = policy["Inline Policy"]
+        if inline_policy and inline_policy != "None":
+            for searched_action, granted_by in match_policy_actions(json.loads(inline_policy), searched_actions):
+                permission_set_matches.append(("Inline", "Inline Policy", searched_action, granted_by))
+
+        for policy_arn in policy.get("AWS Managed Policy ARNs", []):
+            document = get_managed_policy_document(iam_client, policy_arn, policy_cache, version_ids, unresolved_policies)
+            if document is None:
+                unresolved_policies[policy_arn]["Permission Sets"].add(permission_set_name)
+                continue
+            for searched_action, granted_by in match_policy_actions(document, searched_actions):
+                permission_set_matches.append(("AWS Managed", policy_arn.split("/")[-1], searched_action, granted_by))
+
+        # Customer managed policies live in each account the permission set is provisioned to
+        # and are read with that account's IAM client
+        account_matches = {}
+        for account_id in policy.get("Account IDs", []):
+            for reference in policy.get("Customer Managed Policy References", []):
+                policy_arn = f"arn:aws:iam::{account_id}:policy{reference.get('Path', '/')}{reference['Name']}"
+                account_iam_client, reason = get_account_iam_client(account_id, account_clients)
+                document = None
+                if account_iam_client is None:
+                    unresolved_policies.setdefault(policy_arn, {"Reason": reason, "Permission Sets": set()})
+                else:
+                    document = get_managed_policy_document(account_iam_client, policy_arn, policy_cache, version_ids, unresolved_policies)
+                if document is None:
+                    unresolved_policies[policy_arn]["Permission Sets"].add(permission_set_name)
+                    continue
+                for searched_action, granted_by in match_policy_actions(document, searched_actions):
+                    account_matches.setdefault(account_id, []).append(("Customer Managed", reference["Name"], searched_action, granted_by))
+
+        for assignment in assignments:
+            for policy_type, policy_name, searched_action, granted_by in permission_set_matches + account_matches.get(assignment["Account ID"], []):
+                yield {
+                    "Type": assignment["Type"],
+                    "Name": assignment["Name"],
+                    "Account ID": assignment["Account ID"],
+                    "Permission Set": permission_set_name,
+                    "Policy Type": policy_type,
+                    "Policy Name": policy_name,
+                    "Action": searched_action,
+                    "Granted By": granted_by
+                }
+
+    save_policy_cache(policy_cache, cache_path)
+    if unresolved_policies and show_unresolved:
+        display_unresolved_policies(unresolved_policies)
+
+# Search every permission set for the requested actions and return all matches
+def search_permission_set_actions(policies_data, assignments_data, searched_actions, cache_path):
+    return list(iter_action_matches(policies_data, assignments_data, searched_actions, cache_path))
+
+# Display managed policies that could not be searched; their permission sets may grant the actions
+def display_unresolved_policies(unresolved_policies):
+    console.print(f"[bold yellow]{len(unresolved_policies)} managed policies could not be read and were not searched:[/bold yellow]")
+    unresolved_table = Table(title="Unresolved Managed Policies", header_style="bold white", title_style="bold yellow")
+    unresolved_table.add_column(Align("Policy ARN", align="center"), style="white", justify="left")
+    unresolved_table.add_column(Align("Permission Sets", align="center"), style="yellow", justify="left")
+    unresolved_table.add_column(Align("Reason", align="center"), style="red", justify="left")
+    unresolved_table = report_table(unresolved_table, args, "unresolved", summary_column=2)
+    for policy_arn, unresolved in sorted(unresolved_policies.items()):
+        unresolved_table.add_row(policy_arn, ", ".join(sorted(unresolved["Permission Sets"])), unresolved["Reason"])
+    unresolved_table.print(console)
+
+# Display permission sets granting the searched actions as they are found; the matches are
+# returned for the CSV prompt only when keep is set, otherwise only the rendered rows are held
+def display_action_matches(action_matches_data, keep=True):
+    action_table = Table(title="Permission Sets Granting Searched Actions", header_style="bold white", title_style="bold #ab79d5")
+    action_table.add_column(Align("Type", align="center"), style="white", justify="center")
+    action_table.add_column(Align("User/Group Name", align="center"), style="green", justify="left")
+    action_table.add_column(Align("Account ID", align="center"), style="blue", justify="left")
+    action_table.add_column(Align("Permission Set", align="center"), style="yellow", justify="left")
+    action_table.add_column(Align("Policy", align="center"), style="white", justify="left")
+    action_table.add_column(Align("Action", align="center"), style="red", justify="left")
+    action_table.add_column(Align("Granted By", align="center"), style="white", justify="left")
+    action_table = report_table(action_table, args, "actions", summary_column=5)
+
+    kept_matches = []
+    for match in action_matches_data:
+        if keep:
+            kept_matches.append(match)
+        action_table.add_row(
+            match["Type"],
+            match["Name"],
+            match["Account ID"],
+            match["Permission Set"],
+            f"{match['Policy Name']} ({match['Policy Type']})",
+            match["Action"],
+            match["Granted By"]
+        )
+    action_table.print(console, "\n")
+    return kept_matches if keep else None
 
 # Export data to CSV with proper formatting for multiple policies and user-group mappings
-def export_to_csv(assignments_data, policies_data, user_group_map, filename="aws_sso.csv"):
-    with open(filename, mode="w", newline="") as file:
+def export_to_csv(assignments_data, policies_data, user_group_map, filename="aws_sso.csv", access_graph=None, action_matches_data=None):
+    # Rows are written one at a time; a .gz filename compresses the file
+    with open_output(filename) as file:
         writer = csv.writer(file)
         
         # Write assignment data
@@ -298,28 +810,51 @@ def export_to_csv(assignments_data, policies_data, user_group_map, filename="aws
 
         # Write user-group membership data
         writer.writerow(["User Name", "Groups"])
-        for user_name, groups in user_group_map.items():
-            writer.writerow([user_name, ", ".join(groups)])
+        for user in sorted(user_group_map.values(), key=lambda user: user["User Name"]):
+            writer.writerow([user["User Name"], ", ".join(sorted(user["Groups"].values()))])
+
+        # Write effective user access resolved through the access graph
+        if access_graph is not None:
+            writer.writerow([])  # Blank row to separate tables
+            writer.writerow(["User Name", "Account ID", "Permission Set", "Granted Via"])
+            writer.writerows(access_graph.effective_access)
+
+        # Write permission sets granting the searched actions (a list, or an iterable of matches written as it is searched)
+        if action_matches_data is not None:
+            writer.writerow([])  # Blank row to separate tables
+            writer.writerow(["Type", "User/Group Name", "Account ID", "Permission Set", "Policy Type", "Policy Name", "Action", "Granted By"])
+            for match in action_matches_data:
+                writer.writerow([match["Type"], match["Name"], match["Account ID"], match["Permission Set"],
+                                 match["Policy Type"], match["Policy Name"], match["Action"], match["Granted By"]])
 
     console.print(f"Data exported to {filename}")
 
 # Main flow
 if __name__ == "__main__":
+    enable_profiling(args.profile_report, console)
     console.print("\n[bold cyan]-------- AWS Identity Center Permissions Checker created by Gopikrishna --------[/bold cyan]\n", justify="center")
 
     # Prompt for choice to enumerate all accounts or a specific account
     choice = console.input("Type 'yes' to enumerate all accounts, or 'no' to enumerate a specific account: ").strip().lower()
     console.print("Fetching data... Please wait.\n")
 
-    accounts, permission_sets = get_available_accounts()
+    with PROFILER.phase("Account discovery"):
+        accounts, permission_sets = get_available_accounts()
 
     if choice == 'yes':
         console.print("[bold white]Available Accounts:[/bold white]")
         for idx, account in enumerate(accounts, start=1):
             console.print(f"{idx}. {account['Name']} (ID: {account['ID']})")
         console.print("\n")
-        assignments_data, policies_data = fetch_permission_set_data_all(permission_sets)
-        user_group_map = fetch_user_group_memberships()
+        with PROFILER.phase("Permission set enumeration"):
+            journal = open_checkpoint_journal()
+            if args.use_async:
+                assignments_data, policies_data = asyncio.run(fetch_permission_set_data_all_async(permission_sets, args.max_concurrency, journal))
+            else:
+                assignments_data, policies_data = fetch_permission_set_data_all(permission_sets, journal)
+            journal.complete()
+        with PROFILER.phase("Group memberships"):
+            user_group_map = fetch_user_group_memberships()
     else:
         # Display accounts and select a specific account
         console.print("[bold white]Available Accounts:[/bold white]")
@@ -329,14 +864,38 @@ if __name__ == "__main__":
         console.print("Fetching data... Please wait.\n")
         selected_account_id = accounts[selected_index]["ID"]
 
-        assignments_data, policies_data = fetch_permission_set_data(selected_account_id, permission_sets)
-        user_group_map = fetch_user_group_memberships(assignments_data)
+        with PROFILER.phase("Permission set enumeration"):
+            journal = open_checkpoint_journal()
+            assignments_data, policies_data = fetch_permission_set_data(selected_account_id, permission_sets, journal)
+            journal.complete()
+        with PROFILER.phase("Group memberships"):
+            user_group_map = fetch_user_group_memberships(assignments_data)
 
     # Display tables
-    display_tables(assignments_data, policies_data, user_group_map)
+    with PROFILER.phase("Render tables"):
+        display_tables(assignments_data, policies_data, user_group_map)
+
+    # Build the access graph once and answer any queries from it
+    with PROFILER.phase("Access graph"):
+        access_graph = AccessGraph(assignments_data, policies_data, user_group_map)
+        display_effective_access(access_graph.effective_access)
+        run_access_queries(access_graph)
+
+    # Search permission set policies for sensitive actions
+    action_matches_data = None
+    if args.search_actions:
+        searched_actions = [action.strip() for action in args.search_actions.split(",") if action.strip()]
+        with PROFILER.phase("Action search"):
+            # With --export every match is already in the export file, so they are not kept; the CSV export searches again
+            action_matches_data = display_action_matches(
+                iter_action_matches(policies_data, assignments_data, searched_actions, args.policy_cache), keep=not args.export)
 
     # Prompt for CSV export
     export_choice = console.input("Would you like to export the data to CSV? (yes/no): ").strip().lower()
     if export_choice == "yes":
         export_filename = console.input("Enter filename for CSV (default: aws_sso.csv): ").strip() or "aws_sso.csv"
-        export_to_csv(assignments_data, policies_data, user_group_map, export_filename)
+        if args.search_actions and action_matches_data is None:
+            # The matches went to the --export file only; search again, from the policy documents cached by the first search
+            action_matches_data = iter_action_matches(policies_data, assignments_data, searched_actions, args.policy_cache, show_unresolved=False)
+        with PROFILER.phase("CSV export"):
+            export_to_csv(assignments_data, policies_data, user_group_map, export_filename, access_graph, action_matches_data)
@@ -0,0 +1,210 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from rich.console import Console
+from rich.table import Table
+
+# Make the shared aws_security_common package importable when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+console = Console()
+
+TOOLS = ["cloudformation", "sns", "sg", "sg-eni", "sso", "iam"]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark the AWS-Security tools against a synthetic estate without an AWS account")
+    parser.add_argument("--tools", type=str, default=",".join(TOOLS),
+                        help=f"Comma-separated tools to benchmark (default: {','.join(TOOLS)})")
+    parser.add_argument("--scales", type=str, default="100,1000",
+                        help="Comma-separated estate sizes, roughly the number of resources of each kind (default: 100,1000)")
+    parser.add_argument("--region-count", type=int, default=4, help="Number of regions in the synthetic estate (default: 4)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every API request in milliseconds")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random +/- variation of the injected latency in milliseconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Fraction of API requests answered with a throttling error (0-1); botocore retries them")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the estate generator and injected faults")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip peak memory tracking (tracemalloc slows the tools down and inflates wall time)")
+    parser.add_argument("--output", type=str, default=None, help="Write the results as JSON, e.g. to compare runs in CI")
+    return parser.parse_args()
+
+
+# Point boto3 at fake credentials and throwaway caches before any session is created
+def isolate_environment(cache_dir):
+    for variable in ("AWS_PROFILE", "AWS_DEFAULT_PROFILE", "AWS_SESSION_TOKEN", "AWS_SECURITY_TOKEN"):
+        os.environ.pop(variable, None)
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "AWS_CONFIG_FILE": os.path.join(cache_dir, "config"),
+        "AWS_SHARED_CREDENTIALS_FILE": os.path.join(cache_dir, "credentials"),
+        "AWS_EC2_METADATA_DISABLED": "true",
+        "AWS_SECURITY_CACHE_DIR": cache_dir,
+    })
+
+
+# Each workload runs a tool's non-interactive enumeration the way its main() does and returns the resources found
+
+def run_cloudformation(estate, pool):
+    from aws_security_common.regions import RegionDiscovery
+    from aws_security_common.tools import load_tool
+    cfn = load_tool("cloudformation")
+    regions = RegionDiscovery(pool, "cloudformation", refresh=True).regions()
+    return sum(len(stacks or []) for region, stacks, protections in cfn.fetch_stacks(regions, None))
+
+
+def run_sns(estate, pool):
+    from aws_security_common.clients import get_client
+    from aws_security_common.regions import RegionDiscovery
+    from aws_security_common.tools import load_tool
+    sns = load_tool("sns")
+    found = 0
+    for region in RegionDiscovery(pool, "sns", refresh=True).regions():
+        sns_client = get_client("sns", region)
+        for topic in sns.get_sns_topics(region):
+            sns.check_topic_encryption(sns_client, topic["TopicArn"])
+            found += 1
+    return found
+
+
+def run_sg(estate, pool, discovery="services"):
+    from aws_security_common.regions import RegionDiscovery
+    from aws_security_common.tools import load_tool
+    sg = load_tool("sg")
+    # Association lookups are cached per run; start cold like a new process
+    sg.fetch_eks_associations.cache_clear()
+    sg.fetch_ecs_associations.cache_clear()
+    regions = RegionDiscovery(pool, "security-groups", refresh=True).regions()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda region: sg.scan_region(pool, region, discovery), regions))
+    return sum(len(result["sg_ids"]) + len(result["rows"]) for result in results)
+
+
+def run_sg_eni(estate, pool):
+    return run_sg(estate, pool, discovery="eni")
+
+
+def run_sso(estate, pool):
+    from aws_security_common.tools import load_tool
+    sso = load_tool("sso")
+    sso.init_clients()
+    sso.INSTANCE_ARN = estate.instance_arn
+    sso.IDENTITY_STORE_ID = estate.identity_store_id
+    accounts, permission_sets = sso.get_available_accounts()
+    assignments_data, policies_data = sso.fetch_permission_set_data_all(permission_sets)
+    user_group_map = sso.fetch_user_group_memberships()
+    access_graph = sso.AccessGraph(assignments_data, policies_data, user_group_map)
+    cache_path = os.path.join(os.environ["AWS_SECURITY_CACHE_DIR"], f"policy-cache-{time.monotonic_ns()}.json")
+    sso.search_permission_set_actions(policies_data, assignments_data, ["iam:PassRole", "secretsmanager:GetSecretValue"], cache_path)
+    return len(assignments_data) + len(access_graph.effective_access)
+
+
+def run_iam(estate, pool):
+    from aws_security_common.tools import load_tool
+    iam = load_tool("iam")
+    table_data, group_user_mapping, groups_with_permissions = iam.find_matching_permissions(estate.gaad)
+    return len(table_data)
+
+
+WORKLOADS = {
+    "cloudformation": run_cloudformation,
+    "sns": run_sns,
+    "sg": run_sg,
+    "sg-eni": run_sg_eni,
+    "sso": run_sso,
+    "iam": run_iam,
+}
+
+
+# Run one workload and return its measurements
+def measure(tool, estate, pool, backend, track_memory):
+    backend.reset_counters()
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    error = None
+    try:
+        # Tools print progress and errors; keep the benchmark output readable
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            found = WORKLOADS[tool](estate, pool)
+    except Exception as e:
+        found, error = None, str(e)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "tool": tool,
+        "scale": estate.scale,
+        "found": found,
+        "seconds": round(elapsed, 4),
+        "api_calls": backend.calls,
+        "http_attempts": backend.attempts,
+        "throttled": backend.throttled,
+        "peak_memory_mb": round(peak / (1024 * 1024), 2) if peak is not None else None,
+        "error": error,
+    }
+
+
+def main():
+    args = parse_arguments()
+    tools = [tool.strip() for tool in args.tools.split(",") if tool.strip()]
+    unknown = [tool for tool in tools if tool not in WORKLOADS]
+    if unknown:
+        console.print(f"[bold red]Unknown tools: {', '.join(unknown)}[/bold red]")
+        sys.exit(1)
+    scales = [int(scale) for scale in args.scales.split(",") if scale.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="aws-security-benchmark-") as cache_dir:
+        isolate_environment(cache_dir)
+        from fake_aws import FakeAws, SyntheticEstate
+        from aws_security_common.clients import get_client_pool
+
+        pool = get_client_pool()
+        backend = None
+        results = []
+        for scale in scales:
+            console.print(f"[bold blue]Generating synthetic estate at scale {scale}...[/bold blue]")
+            estate = SyntheticEstate(scale, region_count=args.region_count, seed=args.seed)
+            if backend is None:
+                # Installed before the pool creates any client, so every tool's clients are served by it
+                backend = FakeAws(estate, args.latency_ms, args.jitter_ms, args.throttle_rate, args.seed)
+                backend.install(pool.session)
+            backend.estate = estate
+            for tool in tools:
+                console.print(f"Running {tool} at scale {scale}...")
+                results.append(measure(tool, estate, pool, backend, not args.no_memory))
+
+    table = Table(title=f"Benchmark Results (latency {args.latency_ms:g}ms, throttle rate {args.throttle_rate:g})")
+    table.add_column("Tool", style="cyan")
+    table.add_column("Scale", justify="right", style="cyan")
+    table.add_column("Found", justify="right", style="white")
+    table.add_column("Time (s)", justify="right", style="green")
+    table.add_column("API Calls", justify="right", style="yellow")
+    table.add_column("Throttled", justify="right", style="red")
+    table.add_column("Peak Memory (MB)", justify="right", style="magenta")
+    for result in results:
+        table.add_row(
+            result["tool"], str(result["scale"]),
+            str(result["found"]) if result["error"] is None else f"[red]error: {result['error']}[/red]",
+            f"{result['seconds']:.2f}", str(result["api_calls"]), str(result["throttled"]),
+            f"{result['peak_memory_mb']:.1f}" if result["peak_memory_mb"] is not None else "-")
+    console.print(table)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"settings": vars(args), "results": results}, file, indent=2)
+        console.print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
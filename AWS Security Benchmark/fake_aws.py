@@ -0,0 +1,459 @@
+"""
+In-process stand-in for the AWS APIs used by the tools, plus synthetic estates.
+
+FakeAws hooks into a boto3 session's event system instead of the network:
+
+* before-send returns an HTTP response without opening a connection, after
+  an optional injected latency. A configurable fraction of attempts get a
+  protocol-correct throttling error, so botocore's real retry and adaptive
+  rate limiting code runs exactly as it would against AWS.
+* after-call fills the parsed response from the SyntheticEstate, paginating
+  list operations with the service's own paginator configuration.
+
+Operations without a handler return an empty result built from the output
+shape (empty lists), so tools see a region with no such resources.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+import botocore.session
+from botocore.awsrequest import AWSResponse
+
+ACCOUNT_ID = "123456789012"
+ALL_REGIONS = ["us-east-1", "us-west-2", "eu-west-1", "ap-southeast-1",
+               "eu-central-1", "ap-northeast-1", "ca-central-1", "sa-east-1"]
+ACTIVE_STACK_STATUSES = ["CREATE_COMPLETE", "UPDATE_COMPLETE", "ROLLBACK_COMPLETE"]
+AWS_MANAGED_POLICIES = {
+    "AdministratorAccess": [{"Effect": "Allow", "Action": "*", "Resource": "*"}],
+    "ReadOnlyAccess": [{"Effect": "Allow", "Action": ["ec2:Describe*", "s3:Get*", "s3:List*", "iam:Get*", "iam:List*"], "Resource": "*"}],
+    "PowerUserAccess": [{"Effect": "Allow", "NotAction": ["iam:*", "organizations:*", "account:*"], "Resource": "*"}],
+    "SecurityAudit": [{"Effect": "Allow", "Action": ["iam:GenerateCredentialReport", "iam:Get*", "iam:List*"], "Resource": "*"}],
+    "ViewOnlyAccess": [{"Effect": "Allow", "Action": ["ec2:Describe*", "sns:ListTopics"], "Resource": "*"}],
+}
+SENSITIVE_ACTIONS = ["secretsmanager:GetSecretValue", "iam:PassRole", "s3:GetObject", "kms:Decrypt", "iam:*"]
+
+# Default page size when the caller does not pass the paginator's limit key
+DEFAULT_PAGE_SIZE = 100
+PAGE_SIZES = {"DescribeSecurityGroups": 1000, "DescribeInstances": 1000, "DescribeNetworkInterfaces": 1000}
+
+# Throttling error responses per protocol: (status, headers, body)
+THROTTLE_RESPONSES = {
+    "query": (400, {}, b"<ErrorResponse><Error><Type>Sender</Type><Code>Throttling</Code>"
+                       b"<Message>Rate exceeded</Message></Error><RequestId>fake</RequestId></ErrorResponse>"),
+    "ec2": (503, {}, b"<Response><Errors><Error><Code>RequestLimitExceeded</Code>"
+                     b"<Message>Request limit exceeded.</Message></Error></Errors><RequestID>fake</RequestID></Response>"),
+    "json": (400, {}, b'{"__type":"ThrottlingException","message":"Rate exceeded"}'),
+    "rest-json": (429, {"x-amzn-ErrorType": "TooManyRequestsException"}, b'{"message":"Rate exceeded"}'),
+}
+
+
+class _RawBody:
+    """Minimal stand-in for the urllib3 response AWSResponse reads its body from."""
+
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class SyntheticEstate:
+    """A deterministic fake AWS estate; scale is roughly the number of resources of each kind."""
+
+    def __init__(self, scale, region_count=4, seed=0):
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.account_id = ACCOUNT_ID
+        self.regions = ALL_REGIONS[:region_count]
+        self.created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self._generate_stacks()
+        self._generate_topics()
+        self._generate_network()
+        self._generate_sso()
+        self._generate_gaad()
+
+    def _per_region(self, total):
+        """Split a total over the regions (at least one per region)."""
+        count = max(1, total // len(self.regions))
+        return {region: count for region in self.regions}
+
+    def _generate_stacks(self):
+        self.stacks = {}
+        for region, count in self._per_region(self.scale).items():
+            stacks = []
+            for i in range(count):
+                # Roughly one in ten stacks is deleted or failed and filtered out by ListStacks
+                status = self.rng.choice(ACTIVE_STACK_STATUSES) if self.rng.random() > 0.1 else "DELETE_COMPLETE"
+                stacks.append({
+                    "StackName": f"stack-{region}-{i}",
+                    "StackId": f"arn:aws:cloudformation:{region}:{ACCOUNT_ID}:stack/stack-{region}-{i}/{uuid.UUID(int=self.rng.getrandbits(128))}",
+                    "StackStatus": status,
+                    "CreationTime": self.created,
+                    "EnableTerminationProtection": self.rng.random() < 0.3,
+                })
+            self.stacks[region] = stacks
+        self.stacks_by_name = {(region, stack["StackName"]): stack for region, stacks in self.stacks.items() for stack in stacks}
+
+    def _generate_topics(self):
+        self.topics = {}
+        for region, count in self._per_region(self.scale).items():
+            topics = []
+            for i in range(count):
+                attributes = {"TopicArn": f"arn:aws:sns:{region}:{ACCOUNT_ID}:topic-{i}", "Owner": ACCOUNT_ID}
+                if self.rng.random() < 0.5:
+                    attributes["KmsMasterKeyId"] = "alias/aws/sns"
+                topics.append(attributes)
+            self.topics[region] = topics
+        self.topics_by_arn = {topic["TopicArn"]: topic for topics in self.topics.values() for topic in topics}
+
+    def _generate_network(self):
+        """Security groups with EC2 instances, RDS instances and ECS tasks/services attached."""
+        self.security_groups, self.instances, self.db_instances = {}, {}, {}
+        self.network_interfaces, self.prefix_lists, self.ecs_clusters = {}, {}, {}
+        for region, count in self._per_region(self.scale).items():
+            vpc_id = f"vpc-{self.rng.getrandbits(32):08x}"
+            prefix_list_id = f"pl-{self.rng.getrandbits(32):08x}"
+            self.prefix_lists[(region, prefix_list_id)] = ["203.0.113.0/24", "198.51.100.0/24"]
+
+            groups = []
+            for i in range(count):
+                group_id = f"sg-{region.replace('-', '')[:6]}{i:011x}"
+                permissions = [{"IpProtocol": "tcp", "FromPort": 443, "ToPort": 443,
+                                "IpRanges": [{"CidrIp": "10.0.0.0/8"}], "Ipv6Ranges": [], "PrefixListIds": [], "UserIdGroupPairs": []}]
+                roll = self.rng.random()
+                if roll < 0.2:  # Open to the internet
+                    port = self.rng.choice([22, 80, 443, 3389, 5432])
+                    permissions.append({"IpProtocol": "tcp", "FromPort": port, "ToPort": port,
+                                        "IpRanges": [{"CidrIp": "0.0.0.0/0"}], "Ipv6Ranges": [], "PrefixListIds": [], "UserIdGroupPairs": []})
+                elif roll < 0.5 and groups:  # Allows ingress from another group
+                    permissions.append({"IpProtocol": "tcp", "FromPort": 5432, "ToPort": 5432, "IpRanges": [], "Ipv6Ranges": [],
+                                        "PrefixListIds": [], "UserIdGroupPairs": [{"GroupId": self.rng.choice(groups)["GroupId"], "UserId": ACCOUNT_ID}]})
+                elif roll < 0.55:  # Public prefix list
+                    permissions.append({"IpProtocol": "tcp", "FromPort": 8080, "ToPort": 8080, "IpRanges": [], "Ipv6Ranges": [],
+                                        "PrefixListIds": [{"PrefixListId": prefix_list_id}], "UserIdGroupPairs": []})
+                groups.append({"GroupId": group_id, "GroupName": f"group-{i}", "Description": "synthetic",
+                               "OwnerId": ACCOUNT_ID, "VpcId": vpc_id, "IpPermissions": permissions, "IpPermissionsEgress": []})
+            self.security_groups[region] = groups
+
+            interfaces = []
+
+            def add_interface(group_ids, **fields):
+                eni_id = f"eni-{self.rng.getrandbits(64):017x}"
+                interfaces.append(dict({"NetworkInterfaceId": eni_id, "VpcId": vpc_id, "InterfaceType": "interface",
+                                        "PrivateIpAddress": f"10.{self.rng.randrange(256)}.{self.rng.randrange(256)}.{self.rng.randrange(1, 255)}",
+                                        "Groups": [{"GroupId": group_id} for group_id in group_ids]}, **fields))
+                return eni_id
+
+            instances = []
+            for i in range(max(1, count // 2)):
+                instance_id = f"i-{self.rng.getrandbits(64):017x}"
+                group_ids = [group["GroupId"] for group in self.rng.sample(groups, min(len(groups), self.rng.randint(1, 2)))]
+                add_interface(group_ids, Attachment={"InstanceId": instance_id}, Description="")
+                instances.append({"InstanceId": instance_id, "State": {"Name": "running"}, "VpcId": vpc_id,
+                                  "SecurityGroups": [{"GroupId": group_id} for group_id in group_ids]})
+            self.instances[region] = instances
+
+            db_instances = []
+            for i in range(max(1, count // 10)):
+                group_id = self.rng.choice(groups)["GroupId"]
+                add_interface([group_id], RequesterId="amazon-rds", Description="RDSNetworkInterface")
+                db_instances.append({"DBInstanceIdentifier": f"db-{region}-{i}",
+                                     "VpcSecurityGroups": [{"VpcSecurityGroupId": group_id, "Status": "active"}]})
+            self.db_instances[region] = db_instances
+
+            clusters = {}
+            cluster_count = max(1, count // 200)
+            for i in range(cluster_count):
+                clusters[f"arn:aws:ecs:{region}:{ACCOUNT_ID}:cluster/cluster-{i}"] = {"tasks": [], "services": []}
+            cluster_arns = list(clusters)
+            for i in range(max(1, count // 10)):
+                cluster_arn = cluster_arns[i % cluster_count]
+                task_arn = f"{cluster_arn.replace(':cluster/', ':task/')}/{self.rng.getrandbits(64):016x}"
+                eni_id = add_interface([self.rng.choice(groups)["GroupId"]],
+                                       Description=f"arn:aws:ecs:{region}:{ACCOUNT_ID}:attachment/{uuid.UUID(int=self.rng.getrandbits(128))}")
+                clusters[cluster_arn]["tasks"].append({
+                    "taskArn": task_arn, "clusterArn": cluster_arn, "lastStatus": "RUNNING",
+                    "attachments": [{"type": "ElasticNetworkInterface", "details": [{"name": "networkInterfaceId", "value": eni_id}]}]})
+            for i in range(max(1, count // 20)):
+                cluster_arn = cluster_arns[i % cluster_count]
+                clusters[cluster_arn]["services"].append({
+                    "serviceArn": f"{cluster_arn.replace(':cluster/', ':service/')}/service-{i}", "serviceName": f"service-{i}",
+                    "networkConfiguration": {"awsvpcConfiguration": {"subnets": ["subnet-0"], "securityGroups": [self.rng.choice(groups)["GroupId"]]}}})
+            self.ecs_clusters[region] = clusters
+            self.network_interfaces[region] = interfaces
+
+    def _generate_sso(self):
+        """Identity Center permission sets, account assignments, users and groups."""
+        self.instance_arn = "arn:aws:sso:::instance/ssoins-0000000000000000"
+        self.identity_store_id = "d-0000000000"
+        self.accounts = [f"{100000000000 + i}" for i in range(max(2, self.scale // 50))]
+        self.users = {f"user-{i:08d}": f"user{i}@example.com" for i in range(max(2, self.scale // 2))}
+        self.groups = {f"group-{i:08d}": f"Group{i}" for i in range(max(1, self.scale // 20))}
+        user_ids, group_ids = list(self.users), list(self.groups)
+        self.group_members = {group_id: [] for group_id in group_ids}
+        for user_id in user_ids:
+            for group_id in self.rng.sample(group_ids, min(len(group_ids), self.rng.randint(1, 2))):
+                self.group_members[group_id].append(user_id)
+
+        self.permission_sets = {}
+        self.assignments = {}
+        for i in range(max(2, self.scale // 20)):
+            arn = f"{self.instance_arn.replace(':instance/', ':permissionSet/')}/ps-{i:016x}"
+            inline = None
+            if self.rng.random() < 0.3:
+                inline = json.dumps({"Version": "2012-10-17", "Statement": [
+                    {"Effect": "Allow", "Action": self.rng.sample(SENSITIVE_ACTIONS, 2), "Resource": "*"}]})
+            accounts = self.rng.sample(self.accounts, min(len(self.accounts), self.rng.randint(1, 5)))
+            self.permission_sets[arn] = {
+                "Name": f"PermissionSet{i}",
+                "ManagedPolicies": self.rng.sample(list(AWS_MANAGED_POLICIES), self.rng.randint(0, 2)),
+                "CustomerManagedPolicies": [f"custom-policy-{self.rng.randrange(20)}"] if self.rng.random() < 0.2 else [],
+                "InlinePolicy": inline,
+                "Accounts": accounts,
+            }
+            for account_id in accounts:
+                principals = [("USER", self.rng.choice(user_ids)) for _ in range(self.rng.randint(0, 2))]
+                principals += [("GROUP", self.rng.choice(group_ids)) for _ in range(self.rng.randint(1, 2))]
+                self.assignments[(arn, account_id)] = [
+                    {"AccountId": account_id, "PermissionSetArn": arn, "PrincipalType": principal_type, "PrincipalId": principal_id}
+                    for principal_type, principal_id in sorted(set(principals))]
+
+    def _generate_gaad(self):
+        """An 'aws iam get-account-authorization-details' document for the IAM checker."""
+        policies = []
+        for i in range(max(1, self.scale // 10)):
+            statement = [{"Effect": "Allow", "Action": self.rng.sample(SENSITIVE_ACTIONS + ["ec2:DescribeInstances", "s3:ListBucket"], 3), "Resource": "*"}]
+            policies.append({"PolicyName": f"policy-{i}", "Arn": f"arn:aws:iam::{ACCOUNT_ID}:policy/policy-{i}",
+                             "PolicyVersionList": [{"Document": {"Version": "2012-10-17", "Statement": statement}, "IsDefaultVersion": True}]})
+
+        def attachments():
+            return [{"PolicyName": policy["PolicyName"], "PolicyArn": policy["Arn"]}
+                    for policy in self.rng.sample(policies, min(len(policies), self.rng.randint(0, 3)))]
+
+        def inline(name):
+            if self.rng.random() < 0.3:
+                return [{"PolicyName": f"{name}-inline", "PolicyDocument": {"Statement": [
+                    {"Effect": "Allow", "Action": self.rng.choice(SENSITIVE_ACTIONS), "Resource": "*"}]}}]
+            return []
+
+        groups = [{"GroupName": f"iam-group-{i}", "GroupPolicyList": inline(f"iam-group-{i}"), "AttachedManagedPolicies": attachments()}
+                  for i in range(max(1, self.scale // 20))]
+        users = [{"UserName": f"iam-user-{i}", "UserPolicyList": inline(f"iam-user-{i}"), "AttachedManagedPolicies": attachments(),
+                  "GroupList": [group["GroupName"] for group in self.rng.sample(groups, min(len(groups), self.rng.randint(0, 2)))]}
+                 for i in range(self.scale)]
+        roles = [{"RoleName": f"iam-role-{i}", "RolePolicyList": inline(f"iam-role-{i}"), "AttachedManagedPolicies": attachments()}
+                 for i in range(max(1, self.scale // 2))]
+        self.gaad = {"UserDetailList": users, "GroupDetailList": groups, "RoleDetailList": roles, "Policies": policies}
+
+
+# Return the values of one EC2-style filter ({"Name": ..., "Values": [...]}) or None when absent
+def filter_values(params, name):
+    for filter_ in params.get("Filters", []):
+        if filter_["Name"] == name:
+            return set(filter_["Values"])
+    return None
+
+
+class FakeAws:
+    """Serves a SyntheticEstate to every client of the boto3 sessions it is installed on."""
+
+    def __init__(self, estate, latency_ms=0.0, jitter_ms=0.0, throttle_rate=0.0, seed=0):
+        self.estate = estate
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.paginator_models = {}
+        self.loader = botocore.session.get_session()
+        self.reset_counters()
+        self.handlers = {
+            ("sts", "GetCallerIdentity"): lambda region, params: {
+                "Account": ACCOUNT_ID, "Arn": f"arn:aws:iam::{ACCOUNT_ID}:user/benchmark", "UserId": "AIDABENCHMARK"},
+            ("ec2", "DescribeRegions"): lambda region, params: {
+                "Regions": [{"RegionName": name, "Endpoint": f"ec2.{name}.amazonaws.com", "OptInStatus": "opt-in-not-required"}
+                            for name in self.estate.regions]},
+            ("cloudformation", "ListStacks"): self.list_stacks,
+            ("cloudformation", "DescribeStacks"): self.describe_stacks,
+            ("sns", "ListTopics"): lambda region, params: {
+                "Topics": [{"TopicArn": topic["TopicArn"]} for topic in self.estate.topics.get(region, [])]},
+            ("sns", "GetTopicAttributes"): lambda region, params: {"Attributes": dict(self.estate.topics_by_arn[params["TopicArn"]])},
+            ("ec2", "DescribeSecurityGroups"): self.describe_security_groups,
+            ("ec2", "GetManagedPrefixListEntries"): lambda region, params: {
+                "Entries": [{"Cidr": cidr} for cidr in self.estate.prefix_lists.get((region, params["PrefixListId"]), [])]},
+            ("ec2", "DescribeInstances"): self.describe_instances,
+            ("ec2", "DescribeNetworkInterfaces"): self.describe_network_interfaces,
+            ("rds", "DescribeDBInstances"): lambda region, params: {"DBInstances": self.estate.db_instances.get(region, [])},
+            ("ecs", "ListClusters"): lambda region, params: {"clusterArns": list(self.estate.ecs_clusters.get(region, {}))},
+            ("ecs", "ListTasks"): lambda region, params: {
+                "taskArns": [task["taskArn"] for task in self.estate.ecs_clusters[region][params["cluster"]]["tasks"]]},
+            ("ecs", "DescribeTasks"): lambda region, params: {
+                "tasks": [task for task in self.estate.ecs_clusters[region][params["cluster"]]["tasks"] if task["taskArn"] in set(params["tasks"])]},
+            ("ecs", "ListServices"): lambda region, params: {
+                "serviceArns": [service["serviceArn"] for service in self.estate.ecs_clusters[region][params["cluster"]]["services"]]},
+            ("ecs", "DescribeServices"): lambda region, params: {
+                "services": [service for service in self.estate.ecs_clusters[region][params["cluster"]]["services"] if service["serviceArn"] in set(params["services"])]},
+            ("sso-admin", "ListInstances"): lambda region, params: {
+                "Instances": [{"InstanceArn": self.estate.instance_arn, "IdentityStoreId": self.estate.identity_store_id}]},
+            ("sso-admin", "ListPermissionSets"): lambda region, params: {"PermissionSets": list(self.estate.permission_sets)},
+            ("sso-admin", "DescribePermissionSet"): lambda region, params: {
+                "PermissionSet": {"Name": self.estate.permission_sets[params["PermissionSetArn"]]["Name"], "PermissionSetArn": params["PermissionSetArn"]}},
+            ("sso-admin", "ListManagedPoliciesInPermissionSet"): lambda region, params: {
+                "AttachedManagedPolicies": [{"Name": name, "Arn": f"arn:aws:iam::aws:policy/{name}"}
+                                            for name in self.estate.permission_sets[params["PermissionSetArn"]]["ManagedPolicies"]]},
+            ("sso-admin", "ListCustomerManagedPolicyReferencesInPermissionSet"): lambda region, params: {
+                "CustomerManagedPolicyReferences": [{"Name": name, "Path": "/"}
+                                                    for name in self.estate.permission_sets[params["PermissionSetArn"]]["CustomerManagedPolicies"]]},
+            ("sso-admin", "GetInlinePolicyForPermissionSet"): lambda region, params: {
+                "InlinePolicy": self.estate.permission_sets[params["PermissionSetArn"]]["InlinePolicy"] or ""},
+            ("sso-admin", "ListAccountsForProvisionedPermissionSet"): lambda region, params: {
+                "AccountIds": list(self.estate.permission_sets[params["PermissionSetArn"]]["Accounts"])},
+            ("sso-admin", "ListAccountAssignments"): lambda region, params: {
+                "AccountAssignments": self.estate.assignments.get((params["PermissionSetArn"], params["AccountId"]), [])},
+            ("identitystore", "DescribeUser"): lambda region, params: {
+                "UserName": self.estate.users[params["UserId"]], "UserId": params["UserId"], "IdentityStoreId": self.estate.identity_store_id},
+            ("identitystore", "DescribeGroup"): lambda region, params: {
+                "DisplayName": self.estate.groups[params["GroupId"]], "GroupId": params["GroupId"], "IdentityStoreId": self.estate.identity_store_id},
+            ("identitystore", "ListGroups"): lambda region, params: {
+                "Groups": [{"GroupId": group_id, "DisplayName": name, "IdentityStoreId": self.estate.identity_store_id}
+                           for group_id, name in self.estate.groups.items()]},
+            ("identitystore", "ListGroupMemberships"): lambda region, params: {
+                "GroupMemberships": [{"IdentityStoreId": self.estate.identity_store_id, "GroupId": params["GroupId"], "MemberId": {"UserId": user_id}}
+                                     for user_id in self.estate.group_members.get(params["GroupId"], [])]},
+            ("organizations", "DescribeAccount"): lambda region, params: {
+                "Account": {"Id": params["AccountId"], "Name": f"account-{params['AccountId']}", "Status": "ACTIVE"}},
+            ("iam", "GetPolicy"): lambda region, params: {
+                "Policy": {"Arn": params["PolicyArn"], "PolicyName": params["PolicyArn"].rsplit("/", 1)[-1],
+                           "PolicyId": f"ANPA{zlib.crc32(params['PolicyArn'].encode()):08X}", "DefaultVersionId": "v1"}},
+            ("iam", "GetPolicyVersion"): lambda region, params: {
+                "PolicyVersion": {"VersionId": params["VersionId"], "IsDefaultVersion": True, "Document": {
+                    "Version": "2012-10-17", "Statement": AWS_MANAGED_POLICIES.get(params["PolicyArn"].rsplit("/", 1)[-1], [])}}},
+        }
+
+    def reset_counters(self):
+        self.calls = 0
+        self.attempts = 0
+        self.throttled = 0
+
+    def install(self, session):
+        """Serve every client of a boto3 session created after this call."""
+        session.events.register("before-parameter-build", self._capture_call)
+        session.events.register("before-send", self._send)
+        session.events.register("after-call", self._fill_response)
+
+    # Remember the operation being called; the same thread sends its request
+    def _capture_call(self, params, model, context, **kwargs):
+        call = (model, dict(params), context.get("client_region"))
+        context["fake_aws_call"] = call
+        self.local.call = call
+        with self.lock:
+            self.calls += 1
+
+    # Answer the HTTP request in place of AWS, after the injected latency
+    def _send(self, request, **kwargs):
+        model = self.local.call[0]
+        protocol = model.service_model.protocol
+        delay = self.latency_ms + (self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        with self.lock:
+            self.attempts += 1
+            throttled = self.rng.random() < self.throttle_rate
+            self.throttled += int(throttled)
+        if throttled:
+            status, headers, body = THROTTLE_RESPONSES[protocol]
+            return AWSResponse(request.url, status, headers, _RawBody(body))
+
+        # An empty but well-formed success body; the data is filled in after parsing
+        if protocol in ("query", "ec2"):
+            wrapper = model.output_shape.serialization.get("resultWrapper") if model.output_shape else None
+            body = f"<{model.name}Response>{f'<{wrapper}/>' if wrapper else ''}</{model.name}Response>".encode()
+        else:
+            body = b"{}"
+        return AWSResponse(request.url, 200, {}, _RawBody(body))
+
+    def _fill_response(self, http_response, parsed, model, context, **kwargs):
+        if http_response.status_code != 200 or "fake_aws_call" not in context:
+            return
+        model, params, region = context["fake_aws_call"]
+        parsed.update(self.respond(model, params, region))
+
+    def respond(self, model, params, region):
+        handler = self.handlers.get((model.service_model.service_name, model.name))
+        result = handler(region, params) if handler else self.empty_output(model)
+        return self.paginate(model, params, result)
+
+    # Every list member of the output shape set to [], i.e. a service with no resources
+    def empty_output(self, model):
+        if model.output_shape is None:
+            return {}
+        return {name: [] for name, shape in model.output_shape.members.items() if shape.type_name == "list"}
+
+    def paginator_config(self, model):
+        service = model.service_model.service_name
+        if service not in self.paginator_models:
+            try:
+                self.paginator_models[service] = self.loader.get_paginator_model(service)
+            except Exception:
+                self.paginator_models[service] = None
+        try:
+            return self.paginator_models[service].get_paginator(model.name) if self.paginator_models[service] else None
+        except ValueError:
+            return None
+
+    # Slice the result key by the paginator's tokens, like AWS does for large result sets
+    def paginate(self, model, params, result):
+        config = self.paginator_config(model)
+        if not config:
+            return result
+        input_token, output_token, result_key = config.get("input_token"), config.get("output_token"), config.get("result_key")
+        if not all(isinstance(value, str) and value.isidentifier() for value in (input_token, output_token, result_key)):
+            return result
+        if result_key not in result:
+            return result
+        limit_key = config.get("limit_key")
+        page_size = params.get(limit_key) if limit_key else None
+        page_size = page_size or PAGE_SIZES.get(model.name, DEFAULT_PAGE_SIZE)
+        offset = int(params.get(input_token) or 0)
+        items = result[result_key]
+        result[result_key] = items[offset:offset + page_size]
+        if offset + page_size < len(items):
+            result[output_token] = str(offset + page_size)
+        return result
+
+    def list_stacks(self, region, params):
+        statuses = set(params.get("StackStatusFilter") or [])
+        return {"StackSummaries": [{key: stack[key] for key in ("StackName", "StackId", "StackStatus", "CreationTime")}
+                                   for stack in self.estate.stacks.get(region, [])
+                                   if not statuses or stack["StackStatus"] in statuses]}
+
+    def describe_stacks(self, region, params):
+        stack = self.estate.stacks_by_name.get((region, params.get("StackName")))
+        return {"Stacks": [dict(stack)] if stack else []}
+
+    def describe_security_groups(self, region, params):
+        groups = self.estate.security_groups.get(region, [])
+        if params.get("GroupIds"):
+            wanted = set(params["GroupIds"])
+            groups = [group for group in groups if group["GroupId"] in wanted]
+        return {"SecurityGroups": groups}
+
+    def describe_instances(self, region, params):
+        group_ids = filter_values(params, "instance.group-id")
+        instances = [instance for instance in self.estate.instances.get(region, [])
+                     if group_ids is None or any(group["GroupId"] in group_ids for group in instance["SecurityGroups"])]
+        return {"Reservations": [{"ReservationId": f"r-{i:017x}", "Instances": [instance]} for i, instance in enumerate(instances)]}
+
+    def describe_network_interfaces(self, region, params):
+        eni_ids = filter_values(params, "network-interface-id")
+        group_ids = filter_values(params, "group-id")
+        return {"NetworkInterfaces": [eni for eni in self.estate.network_interfaces.get(region, [])
+                                      if (eni_ids is None or eni["NetworkInterfaceId"] in eni_ids)
+                                      and (group_ids is None or any(group["GroupId"] in group_ids for group in eni["Groups"]))]}
@@ -1,170 +1,728 @@
-import boto3
+import bisect
+import functools
+import ipaddress
+import os
+import re
 import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from rich.table import Table
 from rich.console import Console
 
-
-# Function to fetch unique SGs with open inbound rules to 0.0.0.0/0
-def fetch_sg_with_open_inbound(ec2):
-    response = ec2.describe_security_groups()
-
-    open_sgs = set()  # Use a set to ensure unique SG IDs
-    for sg in response["SecurityGroups"]:
+# Make the shared aws_security_common package importable when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_security_common.clients import get_client_pool
+from aws_security_common.regions import RegionDiscovery, add_region_arguments
+from aws_security_common.instrumentation import PROFILER, add_profile_arguments, enable_profiling
+from aws_security_common.output import add_output_arguments, report_table
+
+
+# How public a rule source is, from least to most exposed
+# "Unknown" (a prefix list that could not be read) ranks above every threshold so it is always reported
+EXPOSURE_LEVELS = {"Private": 0, "Public": 1, "Broad Public": 2, "Internet": 3, "Unknown": 4}
+MIN_EXPOSURE_CHOICES = {"public": "Public", "broad": "Broad Public", "internet": "Internet"}
+
+# Address space that is never reachable from the internet
+PRIVATE_NETWORKS = [ipaddress.ip_network(cidr) for cidr in (
+    "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "100.64.0.0/10", "127.0.0.0/8", "169.254.0.0/16",
+    "fc00::/7", "fe80::/10", "::1/128",
+)]
+
+PROTOCOL_NAMES = {"-1": "all", "6": "tcp", "17": "udp", "1": "icmp", "58": "icmpv6"}
+PORT_PROTOCOLS = {"tcp", "udp", "all"}  # Protocols a port query can match
+ICMP_PROTOCOLS = {"icmp", "icmpv6"}  # FromPort/ToPort hold the ICMP type and code, not a port range
+
+
+# Classify how public a CIDR source is
+def classify_cidr(cidr):
+    network = ipaddress.ip_network(cidr, strict=False)
+    if network.prefixlen == 0:
+        return "Internet"
+    if any(network.version == private.version and network.subnet_of(private) for private in PRIVATE_NETWORKS):
+        return "Private"
+    if network.prefixlen <= (8 if network.version == 4 else 32):
+        return "Broad Public"
+    return "Public"
+
+
+# Paginate over every security group in the region
+def fetch_security_groups(ec2):
+    security_groups = []
+    for page in ec2.get_paginator("describe_security_groups").paginate():
+        security_groups.extend(page["SecurityGroups"])
+    return security_groups
+
+
+# Resolve the CIDRs of every prefix list referenced by an ingress rule (None when unreadable)
+def resolve_prefix_lists(ec2, security_groups):
+    prefix_list_ids = {prefix_list["PrefixListId"]
+                       for sg in security_groups
+                       for permission in sg.get("IpPermissions", [])
+                       for prefix_list in permission.get("PrefixListIds", [])}
+    prefix_lists = {}
+    for prefix_list_id in prefix_list_ids:
+        try:
+            prefix_lists[prefix_list_id] = [entry["Cidr"]
+                                            for page in ec2.get_paginator("get_managed_prefix_list_entries").paginate(PrefixListId=prefix_list_id)
+                                            for entry in page["Entries"]]
+        except Exception:
+            prefix_lists[prefix_list_id] = None
+    return prefix_lists
+
+
+# Normalize the protocol and port interval of an ingress permission (ICMP keeps its type and code)
+def normalize_protocol_ports(permission):
+    ip_protocol = str(permission.get("IpProtocol", "-1")).lower()
+    protocol = PROTOCOL_NAMES.get(ip_protocol, ip_protocol)
+    from_port = permission.get("FromPort", -1)
+    to_port = permission.get("ToPort", -1)
+    if protocol in ICMP_PROTOCOLS:
+        return protocol, from_port, to_port
+    if protocol == "all" or from_port == -1:
+        from_port, to_port = 0, 65535
+    return protocol, from_port, to_port
+
+
+# Normalize every ingress rule into (SG ID, protocol, from port, to port, source, exposure) tuples
+def normalize_ingress_rules(security_groups, prefix_lists):
+    rules = []
+    for sg in security_groups:
         for permission in sg.get("IpPermissions", []):
+            protocol, from_port, to_port = normalize_protocol_ports(permission)
+
             for ip_range in permission.get("IpRanges", []):
-                if ip_range.get("CidrIp") == "0.0.0.0/0":
-                    open_sgs.add(sg["GroupId"])  # Add SG ID to the set
-                    break
-    return list(open_sgs)  # Convert set back to a list for further processing
-
-
-# Function to check service associations
-def check_service_associations(sg_id, service, function, description):
-    try:
-        result = function(sg_id)
-        if result:
-            return {
-                "Service": service,
-                "Description": description,
-                "Result": ", ".join(result)
-            }
-        else:
-            return None  # Skip services with no associations
-    except Exception as e:
+                rules.append((sg["GroupId"], protocol, from_port, to_port, ip_range["CidrIp"], classify_cidr(ip_range["CidrIp"])))
+            for ip_range in permission.get("Ipv6Ranges", []):
+                rules.append((sg["GroupId"], protocol, from_port, to_port, ip_range["CidrIpv6"], classify_cidr(ip_range["CidrIpv6"])))
+            for prefix_list in permission.get("PrefixListIds", []):
+                cidrs = prefix_lists.get(prefix_list["PrefixListId"])
+                if cidrs is None:
+                    exposure = "Unknown"  # Unknown contents, report rather than hide
+                else:
+                    exposure = max((classify_cidr(cidr) for cidr in cidrs), key=EXPOSURE_LEVELS.get, default="Private")
+                rules.append((sg["GroupId"], protocol, from_port, to_port, prefix_list["PrefixListId"], exposure))
+    return rules
+
+
+# Merge overlapping port intervals per (SG, protocol, exposure) for rules at or above the exposure threshold.
+# Ranges of different exposure levels are never merged, so a port only reports the exposure of the rules covering it.
+def merge_exposed_rules(rules, min_exposure="Broad Public"):
+    threshold = EXPOSURE_LEVELS[min_exposure]
+    grouped = {}
+    for sg_id, protocol, from_port, to_port, source, exposure in rules:
+        if EXPOSURE_LEVELS[exposure] >= threshold:
+            grouped.setdefault((sg_id, protocol, exposure), []).append((from_port, to_port, source))
+
+    exposures = {}  # SG ID -> [(protocol, from port, to port, sources, exposure)]
+    for (sg_id, protocol, exposure), intervals in grouped.items():
+        intervals.sort()
+        merged = []
+        for from_port, to_port, source in intervals:
+            if protocol in ICMP_PROTOCOLS:
+                # Type and code are not a range; only identical type/code pairs share a row
+                if merged and (from_port, to_port) == (merged[-1][1], merged[-1][2]):
+                    merged[-1][3].add(source)
+                else:
+                    merged.append([protocol, from_port, to_port, {source}, exposure])
+            elif merged and from_port <= merged[-1][2] + 1:
+                last = merged[-1]
+                last[2] = max(last[2], to_port)
+                last[3].add(source)
+            else:
+                merged.append([protocol, from_port, to_port, {source}, exposure])
+        exposures.setdefault(sg_id, []).extend(
+            (protocol, from_port, to_port, sorted(sources), exposure) for protocol, from_port, to_port, sources, exposure in merged)
+    for merged in exposures.values():
+        merged.sort(key=lambda entry: (entry[0], entry[1], entry[2], -EXPOSURE_LEVELS[entry[4]]))
+    return exposures
+
+
+# Build the SG reference graph: referenced SG -> [(referencing SG, protocol, from port, to port)]
+def build_sg_reference_graph(security_groups):
+    graph = {}
+    for sg in security_groups:
+        for permission in sg.get("IpPermissions", []):
+            protocol, from_port, to_port = normalize_protocol_ports(permission)
+            for pair in permission.get("UserIdGroupPairs", []):
+                if pair.get("GroupId") and pair["GroupId"] != sg["GroupId"]:
+                    graph.setdefault(pair["GroupId"], []).append((sg["GroupId"], protocol, from_port, to_port))
+    return graph
+
+
+# Single breadth-first traversal seeded from the internet-open SGs.
+# Returns SG ID -> (parent SG ID, protocol, from port, to port) for every transitively exposed SG.
+def compute_transitive_exposure(graph, exposed_sg_ids):
+    visited = set(exposed_sg_ids)
+    parents = {}
+    queue = deque(sorted(exposed_sg_ids))
+    while queue:
+        sg_id = queue.popleft()
+        for target_sg_id, protocol, from_port, to_port in graph.get(sg_id, []):
+            if target_sg_id in visited:
+                continue
+            visited.add(target_sg_id)
+            parents[target_sg_id] = (sg_id, protocol, from_port, to_port)
+            queue.append(target_sg_id)
+    return parents
+
+
+# Reconstruct "Internet -> sg-a -> sg-b" from the traversal's parent links
+def format_exposure_path(sg_id, parents):
+    path = [sg_id]
+    while sg_id in parents:
+        sg_id = parents[sg_id][0]
+        path.append(sg_id)
+    path.append("Internet")
+    return " -> ".join(reversed(path))
+
+
+# Centered interval tree answering "which exposures cover port N" in O(log n + matches)
+class PortIntervalIndex:
+    def __init__(self, intervals):
+        # intervals: [(from port, to port, payload)]
+        self.root = self._build(list(intervals))
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        points = sorted(point for from_port, to_port, payload in intervals for point in (from_port, to_port))
+        center = points[len(points) // 2]
+        left = [interval for interval in intervals if interval[1] < center]
+        right = [interval for interval in intervals if interval[0] > center]
+        overlapping = [interval for interval in intervals if interval[0] <= center <= interval[1]]
+        by_start = sorted(overlapping, key=lambda interval: interval[0])
+        by_end = sorted(overlapping, key=lambda interval: interval[1], reverse=True)
+        return {
+            "center": center,
+            "by_start": by_start,
+            "starts": [interval[0] for interval in by_start],
+            "by_end": by_end,
+            "ends": [-interval[1] for interval in by_end],
+            "left": self._build(left),
+            "right": self._build(right),
+        }
+
+    def query(self, port):
+        matches = []
+        node = self.root
+        while node:
+            if port < node["center"]:
+                matches.extend(interval[2] for interval in node["by_start"][:bisect.bisect_right(node["starts"], port)])
+                node = node["left"]
+            elif port > node["center"]:
+                matches.extend(interval[2] for interval in node["by_end"][:bisect.bisect_right(node["ends"], -port)])
+                node = node["right"]
+            else:
+                matches.extend(interval[2] for interval in node["by_start"])
+                break
+        return matches
+
+
+# Format a merged port interval (or ICMP type and code) for display
+def format_ports(protocol, from_port, to_port):
+    if protocol in ICMP_PROTOCOLS:
+        if from_port == -1:
+            return "all"
+        return f"type {from_port}" if to_port == -1 else f"type {from_port} code {to_port}"
+    if from_port == 0 and to_port == 65535:
+        return "all"
+    return str(from_port) if from_port == to_port else f"{from_port}-{to_port}"
+
+
+# Drain one inventory generator so its API calls run inside the worker thread
+def fetch_inventory(function, clients, region, sg_ids):
+    return list(function(clients, region, sg_ids))
+
+
+# Build a SG ID -> {service: [resources]} index, fetching each service's inventory only once (concurrently)
+def build_sg_resource_index(clients, region, sg_ids, service_inventories):
+    wanted = set(sg_ids)
+    index = {}
+    errors = {}
+    inventories = {}
+    with ThreadPoolExecutor(max_workers=len(service_inventories)) as executor:
+        futures = {executor.submit(fetch_inventory, function, clients, region, sg_ids): service
+                   for service, function, description in service_inventories}
+        for future in as_completed(futures):
+            service = futures[future]
+            try:
+                inventories[service] = future.result()
+            except Exception as e:
+                errors[service] = f"Error: {str(e)}"
+
+    for service, function, description in service_inventories:
+        for sg_id, resource_id in inventories.get(service, []):
+            if sg_id in wanted:
+                resources = index.setdefault(sg_id, {}).setdefault(service, [])
+                if resource_id not in resources:
+                    resources.append(resource_id)
+    return index, errors
+
+
+# Add each open SG's VPC to the index from the security groups already fetched
+def add_vpc_associations(index, security_groups, sg_ids):
+    wanted = set(sg_ids)
+    for sg in security_groups:
+        if sg["GroupId"] in wanted and sg.get("VpcId"):
+            index.setdefault(sg["GroupId"], {})["VPC"] = [sg["VpcId"]]
+
+
+# Function to look up the associations of one SG in the index
+def check_service_associations(sg_id, service, description, index, errors):
+    if service in errors:
+        return {
+            "Service": service,
+            "Description": description,
+            "Result": errors[service]
+        }
+    result = index.get(sg_id, {}).get(service)
+    if result:
         return {
             "Service": service,
             "Description": description,
-            "Result": f"Error: {str(e)}"
+            "Result": ", ".join(result)
         }
+    return None  # Skip services with no associations
+
+
+# Functions to fetch each service's inventory once and yield (SG ID, resource) pairs
+def inventory_rds(clients, region, sg_ids):
+    client = clients.get("rds", region)
+    for page in client.get_paginator("describe_db_instances").paginate():
+        for db in page["DBInstances"]:
+            for sg in db.get("VpcSecurityGroups", []):
+                yield sg["VpcSecurityGroupId"], db["DBInstanceIdentifier"]
+
+
+def inventory_ec2(clients, region, sg_ids):
+    client = clients.get("ec2", region)
+    # Filter values are capped per request, so query the open SGs in chunks
+    for i in range(0, len(sg_ids), 200):
+        filters = [{"Name": "instance.group-id", "Values": sg_ids[i:i + 200]}]
+        for page in client.get_paginator("describe_instances").paginate(Filters=filters):
+            for reservation in page["Reservations"]:
+                for instance in reservation["Instances"]:
+                    for sg in instance.get("SecurityGroups", []):
+                        yield sg["GroupId"], instance["InstanceId"]
+
+
+def inventory_elb(clients, region, sg_ids):
+    client = clients.get("elb", region)
+    for page in client.get_paginator("describe_load_balancers").paginate():
+        for lb in page["LoadBalancerDescriptions"]:
+            for sg_id in lb.get("SecurityGroups", []):
+                yield sg_id, lb["LoadBalancerName"]
 
 
-# Functions to query AWS resources
-def check_rds(sg_id, session):
-    client = session.client("rds")
-    response = client.describe_db_instances()
-    return [db["DBInstanceIdentifier"] for db in response["DBInstances"]
-            if sg_id in [sg["VpcSecurityGroupId"] for sg in db["VpcSecurityGroups"]]]
+def inventory_eks(clients, region, sg_ids):
+    return fetch_eks_associations(clients, region)
 
 
-def check_ec2(sg_id, session):
-    client = session.client("ec2")
-    response = client.describe_instances(Filters=[{"Name": "instance.group-id", "Values": [sg_id]}])
-    return [instance["InstanceId"] for reservation in response["Reservations"] for instance in reservation["Instances"]]
+def inventory_redis(clients, region, sg_ids):
+    client = clients.get("elasticache", region)
+    for page in client.get_paginator("describe_cache_clusters").paginate():
+        for cache in page["CacheClusters"]:
+            for sg in cache.get("SecurityGroups", []):
+                yield sg["SecurityGroupId"], cache["CacheClusterId"]
 
 
-def check_elb(sg_id, session):
-    client = session.client("elb")
-    response = client.describe_load_balancers()
-    return [lb["LoadBalancerName"] for lb in response["LoadBalancerDescriptions"] if sg_id in lb["SecurityGroups"]]
+def inventory_memorydb(clients, region, sg_ids):
+    client = clients.get("memorydb", region)
+    for page in client.get_paginator("describe_clusters").paginate():
+        for cluster in page["Clusters"]:
+            for sg in cluster.get("SecurityGroups", []):
+                yield sg["SecurityGroupId"], cluster["Name"]
 
 
-def check_vpc(sg_id, session):
-    client = session.client("ec2")
-    response = client.describe_security_groups(GroupIds=[sg_id])
-    return [sg["VpcId"] for sg in response["SecurityGroups"]]
+def inventory_ecs(clients, region, sg_ids):
+    return fetch_ecs_associations(clients, region)
 
 
-def check_eks(sg_id, session):
-    client = session.client("eks")
-    response = client.list_clusters()
-    clusters = response["clusters"]
-    matched_clusters = []
-    for cluster_name in clusters:
-        cluster = client.describe_cluster(name=cluster_name)
-        if sg_id in cluster["cluster"]["resourcesVpcConfig"]["securityGroupIds"]:
-            matched_clusters.append(cluster_name)
-    return matched_clusters
+# Maximum number of ECS/EKS clusters described concurrently per region
+CLUSTER_WORKERS = 8
 
 
-def check_redis(sg_id, session):
-    client = session.client("elasticache")
-    response = client.describe_cache_clusters()
-    return [cache["CacheClusterId"] for cache in response["CacheClusters"]
-            if sg_id in [sg["SecurityGroupId"] for sg in cache.get("SecurityGroups", [])]]
+# Fetch the SGs of one EKS cluster (additional SGs and the EKS-managed cluster SG)
+def fetch_eks_cluster_associations(client, cluster_name):
+    vpc_config = client.describe_cluster(name=cluster_name)["cluster"]["resourcesVpcConfig"]
+    sg_ids = list(vpc_config.get("securityGroupIds", []))
+    if vpc_config.get("clusterSecurityGroupId"):
+        sg_ids.append(vpc_config["clusterSecurityGroupId"])
+    return [(sg_id, cluster_name) for sg_id in sg_ids]
 
 
-def check_memorydb(sg_id, session):
-    client = session.client("memorydb")
-    response = client.describe_clusters()
-    return [cluster["Name"] for cluster in response["Clusters"]
-            if sg_id in [sg["SecurityGroupId"] for sg in cluster.get("SecurityGroups", [])]]
+# Every EKS cluster in the region, described concurrently and cached for the rest of the run
+@functools.lru_cache(maxsize=None)
+def fetch_eks_associations(clients, region):
+    client = clients.get("eks", region)
+    cluster_names = [name for page in client.get_paginator("list_clusters").paginate() for name in page["clusters"]]
+    associations = []
+    with ThreadPoolExecutor(max_workers=CLUSTER_WORKERS) as executor:
+        for cluster_associations in executor.map(functools.partial(fetch_eks_cluster_associations, client), cluster_names):
+            associations.extend(cluster_associations)
+    return associations
 
 
-def check_ecs(sg_id, session):
-    client = session.client("ecs")
-    response = client.list_clusters()
-    clusters = response["clusterArns"]
-    matched_tasks = []
-    for cluster_arn in clusters:
-        tasks = client.list_tasks(cluster=cluster_arn)
-        if not tasks["taskArns"]:
-            continue
-        task_descriptions = client.describe_tasks(cluster=cluster_arn, tasks=tasks["taskArns"])
-        for task in task_descriptions["tasks"]:
+# Fetch the SGs of one ECS cluster's awsvpc tasks and services
+def fetch_ecs_cluster_associations(client, ec2, cluster_arn):
+    associations = []
+
+    # describe_tasks accepts at most 100 tasks per call
+    task_enis = {}
+    task_arns = [arn for page in client.get_paginator("list_tasks").paginate(cluster=cluster_arn) for arn in page["taskArns"]]
+    for i in range(0, len(task_arns), 100):
+        for task in client.describe_tasks(cluster=cluster_arn, tasks=task_arns[i:i + 100])["tasks"]:
             for attachment in task.get("attachments", []):
                 for detail in attachment.get("details", []):
-                    if detail.get("value") == sg_id:
-                        matched_tasks.append(task["taskArn"])
-    return matched_tasks
+                    if detail.get("name") == "networkInterfaceId":
+                        task_enis[detail["value"]] = task["taskArn"]
+
+    # Task SGs live on the task's ENI, so resolve them in batches of ENI IDs
+    eni_ids = list(task_enis)
+    for i in range(0, len(eni_ids), 200):
+        filters = [{"Name": "network-interface-id", "Values": eni_ids[i:i + 200]}]
+        for page in ec2.get_paginator("describe_network_interfaces").paginate(Filters=filters):
+            for eni in page["NetworkInterfaces"]:
+                for group in eni.get("Groups", []):
+                    associations.append((group["GroupId"], task_enis[eni["NetworkInterfaceId"]]))
+
+    # describe_services accepts at most 10 services per call
+    service_arns = [arn for page in client.get_paginator("list_services").paginate(cluster=cluster_arn) for arn in page["serviceArns"]]
+    for i in range(0, len(service_arns), 10):
+        for service in client.describe_services(cluster=cluster_arn, services=service_arns[i:i + 10])["services"]:
+            vpc_config = service.get("networkConfiguration", {}).get("awsvpcConfiguration", {})
+            for sg_id in vpc_config.get("securityGroups", []):
+                associations.append((sg_id, service["serviceArn"]))
+    return associations
+
+
+# Every ECS cluster in the region, fetched concurrently and cached for the rest of the run
+@functools.lru_cache(maxsize=None)
+def fetch_ecs_associations(clients, region):
+    client = clients.get("ecs", region)
+    ec2 = clients.get("ec2", region)
+    cluster_arns = [arn for page in client.get_paginator("list_clusters").paginate() for arn in page["clusterArns"]]
+    associations = []
+    with ThreadPoolExecutor(max_workers=CLUSTER_WORKERS) as executor:
+        for cluster_associations in executor.map(functools.partial(fetch_ecs_cluster_associations, client, ec2), cluster_arns):
+            associations.extend(cluster_associations)
+    return associations
+
+
+# Descriptions for services discovered from network interfaces
+ENI_SERVICE_DESCRIPTIONS = {
+    "EC2": "Elastic Compute Cloud (EC2)",
+    "Lambda": "AWS Lambda",
+    "ALB": "Application Load Balancer (ELBv2)",
+    "NLB": "Network Load Balancer (ELBv2)",
+    "GWLB": "Gateway Load Balancer (ELBv2)",
+    "ELB": "Elastic Load Balancing (ELB)",
+    "RDS": "Relational Database Service (RDS)",
+    "ECS": "Elastic Container Service (ECS)",
+    "EKS": "Elastic Kubernetes Service (EKS)",
+    "ElastiCache": "ElastiCache",
+    "MemoryDB": "MemoryDB",
+    "OpenSearch": "OpenSearch Service",
+    "EFS": "Elastic File System (EFS)",
+    "VPC Endpoint": "VPC Interface Endpoint",
+    "Redshift": "Redshift",
+    "NAT Gateway": "NAT Gateway",
+    "VPC": "Virtual Private Cloud (VPC)",
+}
+
+# (service, description regex) pairs; the first capture group names the owning resource
+ENI_DESCRIPTION_PATTERNS = [
+    ("Lambda", re.compile(r"^AWS Lambda VPC ENI-(.+?)(?:-[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})?$")),
+    ("ALB", re.compile(r"^ELB (app/[^/]+/[0-9a-f]+)$")),
+    ("NLB", re.compile(r"^ELB (net/[^/]+/[0-9a-f]+)$")),
+    ("GWLB", re.compile(r"^ELB (gwy/[^/]+/[0-9a-f]+)$")),
+    ("ELB", re.compile(r"^ELB ([^/\s]+)$")),
+    ("ECS", re.compile(r"^(arn:aws[\w-]*:ecs:.+)$")),
+    ("EKS", re.compile(r"^Amazon EKS (\S+)$")),
+    ("ElastiCache", re.compile(r"^ElastiCache (\S+)$")),
+    ("MemoryDB", re.compile(r"^MemoryDB (\S+)$")),
+    ("OpenSearch", re.compile(r"^ES (\S+)$")),
+    ("EFS", re.compile(r"^EFS mount target for (fs-[0-9a-f]+)")),
+    ("VPC Endpoint", re.compile(r"^VPC Endpoint Interface (vpce-[0-9a-f]+)$")),
+    ("NAT Gateway", re.compile(r"^Interface for NAT Gateway (nat-[0-9a-f]+)$")),
+]
+
+# Map the requester of a managed ENI to a service when the description is not specific enough
+ENI_REQUESTERS = {
+    "amazon-rds": "RDS",
+    "amazon-redshift": "Redshift",
+    "amazon-elasticache": "ElastiCache",
+    "amazon-elasticsearch": "OpenSearch",
+    "amazon-elb": "ELB",
+}
+
+
+# Map a network interface back to its owning (service, resource)
+def classify_network_interface(eni):
+    attachment = eni.get("Attachment", {})
+    if attachment.get("InstanceId"):
+        return "EC2", attachment["InstanceId"]
+
+    interface_type = eni.get("InterfaceType", "interface")
+    description = eni.get("Description", "")
+    for service, pattern in ENI_DESCRIPTION_PATTERNS:
+        match = pattern.match(description)
+        if match:
+            return service, match.group(1)
+
+    if interface_type == "lambda":
+        return "Lambda", description or eni["NetworkInterfaceId"]
+    if interface_type == "vpc_endpoint":
+        return "VPC Endpoint", description or eni["NetworkInterfaceId"]
+    if interface_type == "efs":
+        return "EFS", description or eni["NetworkInterfaceId"]
+    if interface_type == "nat_gateway":
+        return "NAT Gateway", description or eni["NetworkInterfaceId"]
+
+    # Services such as RDS and Redshift only leave a generic description, so report the ENI itself
+    requester_service = ENI_REQUESTERS.get(eni.get("RequesterId", ""))
+    if requester_service:
+        return requester_service, f"{eni['NetworkInterfaceId']} ({eni.get('PrivateIpAddress', description)})"
+
+    # Unknown owner: report the ENI itself under its interface type or requester
+    owner = eni.get("RequesterId") or interface_type
+    return f"ENI ({owner})", f"{eni['NetworkInterfaceId']} {description}".strip()
+
+
+# Build the SG ID -> {service: [resources]} index from a few bulk describe_network_interfaces calls
+def build_eni_association_index(clients, region, sg_ids):
+    wanted = set(sg_ids)
+    index = {}
+    client = clients.get("ec2", region)
+    # Filter values are capped per request, so query the open SGs in chunks
+    for i in range(0, len(sg_ids), 200):
+        filters = [{"Name": "group-id", "Values": sg_ids[i:i + 200]}]
+        for page in client.get_paginator("describe_network_interfaces").paginate(Filters=filters):
+            for eni in page["NetworkInterfaces"]:
+                service, resource_id = classify_network_interface(eni)
+                for group in eni.get("Groups", []):
+                    if group["GroupId"] not in wanted:
+                        continue
+                    services = index.setdefault(group["GroupId"], {})
+                    for key, value in ((service, resource_id), ("VPC", eni.get("VpcId"))):
+                        resources = services.setdefault(key, [])
+                        if value and value not in resources:
+                            resources.append(value)
+    return index, {}
+
+
+# Service inventories (VPC associations come from the security groups themselves)
+SERVICE_INVENTORIES = [
+    ("RDS", inventory_rds, "Relational Database Service (RDS)"),
+    ("ECS", inventory_ecs, "Elastic Container Service (ECS)"),
+    ("EKS", inventory_eks, "Elastic Kubernetes Service (EKS)"),
+    ("EC2", inventory_ec2, "Elastic Compute Cloud (EC2)"),
+    ("ELB", inventory_elb, "Elastic Load Balancing (ELB)"),
+    ("ElastiCache", inventory_redis, "ElastiCache"),
+    ("MemoryDB", inventory_memorydb, "MemoryDB"),
+]
+
+
+# Scan one region: find open SGs and resolve their associations from the region's index
+def scan_region(clients, region, discovery="services", min_exposure="Broad Public", include_transitive=True):
+    ec2 = clients.get("ec2", region)
+    with PROFILER.phase("Fetch security groups"):
+        security_groups = fetch_security_groups(ec2)
+        prefix_lists = resolve_prefix_lists(ec2, security_groups)
+    with PROFILER.phase("Rule analysis"):
+        rules = normalize_ingress_rules(security_groups, prefix_lists)
+        exposures = merge_exposed_rules(rules, min_exposure)
+        transitive = compute_transitive_exposure(build_sg_reference_graph(security_groups), exposures) if include_transitive else {}
+    sg_ids = sorted(set(exposures) | set(transitive))
+    result = {"sg_ids": sg_ids, "rows": [], "exposures": exposures, "transitive": transitive,
+              "has_security_groups": bool(security_groups)}
+    if not sg_ids:
+        return result
+
+    with PROFILER.phase("Association lookup"):
+        if discovery == "eni":
+            index, errors = build_eni_association_index(clients, region, sg_ids)
+            discovered = {service for services in index.values() for service in services}
+            known = [service for service in ENI_SERVICE_DESCRIPTIONS if service in discovered]
+            services = [(service, ENI_SERVICE_DESCRIPTIONS[service]) for service in known]
+            services += [(service, "Network Interface") for service in sorted(discovered - set(known))]
+        else:
+            index, errors = build_sg_resource_index(clients, region, sg_ids, SERVICE_INVENTORIES)
+            add_vpc_associations(index, security_groups, sg_ids)
+            services = [(service, description) for service, function, description in SERVICE_INVENTORIES]
+            services.append(("VPC", ENI_SERVICE_DESCRIPTIONS["VPC"]))
+
+    for sg_id in sg_ids:
+        for service, description in services:
+            association = check_service_associations(sg_id, service, description, index, errors)
+            if association:  # Add only if there's an association
+                result["rows"].append((region, sg_id, association["Service"], association["Description"], association["Result"]))
+    return result
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Find Security Groups open to the internet and the resources using them")
+    parser.add_argument("--all-regions", action="store_true", help="Scan every enabled region instead of the profile's default region")
+    add_region_arguments(parser)
+    parser.add_argument("--max-workers", type=int, default=8, help="Maximum number of regions scanned concurrently")
+    parser.add_argument("--discovery", choices=["services", "eni"], default="services",
+                        help="'services' queries each supported service's inventory, 'eni' maps network interfaces of the open SGs to their owners")
+    parser.add_argument("--min-exposure", choices=list(MIN_EXPOSURE_CHOICES), default="broad",
+                        help="Least public source that counts as exposed: 'internet' (0.0.0.0/0, ::/0), 'broad' (also very large public CIDRs) or 'public' (any public CIDR)")
+    parser.add_argument("--ports", type=str, default=None,
+                        help="Comma-separated ports to report exposure for (e.g. 22,3389,5432)")
+    parser.add_argument("--no-transitive", action="store_true",
+                        help="Do not follow SG-to-SG references from internet-exposed Security Groups")
+    add_profile_arguments(parser)
+    add_output_arguments(parser)
+    return parser.parse_args()
 
 
 # Main function
 def main():
+    args = parse_arguments()
+    enable_profiling(args.profile_report)
+
     # Ask user for AWS profile
     aws_profile = input("Enter the AWS profile to use (press Enter to use 'default'): ").strip() or "default"
 
-    # Set up session with the chosen profile
-    session = boto3.Session(profile_name=aws_profile)
-    ec2 = session.client("ec2")
+    # Shared client pool for the chosen profile
+    clients = get_client_pool(aws_profile)
 
-    # Fetch unique SGs with open inbound rules
-    print("Fetching Security Groups with inbound rules open to 0.0.0.0/0...")
-    sg_ids = fetch_sg_with_open_inbound(ec2)
+    discovery = None
+    with PROFILER.phase("Region discovery"):
+        if args.all_regions or args.regions:
+            discovery = RegionDiscovery(clients, "security-groups", ttl=args.region_cache_ttl, refresh=args.refresh_regions)
+            regions = discovery.regions(args.regions, args.skip_empty_regions)
+        else:
+            regions = [clients.region_name]
 
-    if not sg_ids:
-        print("No Security Groups found with inbound rules open to 0.0.0.0/0.")
-        sys.exit(0)
+    console = Console()
 
-    print(f"Found {len(sg_ids)} Security Groups with open inbound rules:")
-    for sg_id in sg_ids:
-        print(f"- {sg_id}")
+    # Table of exposed protocols, merged port ranges and sources per SG
+    exposure_table = Table(title="Security Group Exposure")
+    exposure_table.add_column("Region", justify="center")
+    exposure_table.add_column("SG ID", justify="center", style="bold")
+    exposure_table.add_column("Protocol", justify="center")
+    exposure_table.add_column("Ports", justify="center")
+    exposure_table.add_column("Sources", justify="left")
+    exposure_table.add_column("Exposure", justify="center", style="red")
+    exposure_table = report_table(exposure_table, args, "exposure")
+
+    # Table of SGs reachable through an internet-exposed SG they allow ingress from
+    transitive_table = Table(title="Transitive Security Group Exposure")
+    transitive_table.add_column("Region", justify="center")
+    transitive_table.add_column("SG ID", justify="center", style="bold")
+    transitive_table.add_column("Exposure Path", justify="left")
+    transitive_table.add_column("Allowed From Previous SG", justify="center")
+    transitive_table = report_table(transitive_table, args, "transitive")
 
     # Table to display results
-    console = Console()
     table = Table(title="Security Group Associations")
+    table.add_column("Region", justify="center")
     table.add_column("SG ID", justify="center", style="bold")
     table.add_column("Service", justify="center")
     table.add_column("Description", justify="center")
     table.add_column("Result", justify="left")
+    table = report_table(table, args, "associations", summary_column=2)
+
+    # Each region's rows go to the tables (and --export) as soon as the region finishes; only the
+    # rendered rows, the SG IDs to list and, for --ports, the exposed port intervals are kept
+    open_sg_count = 0
+    listed = []
+    intervals = []
+
+    def add_region_rows(region, result):
+        nonlocal open_sg_count
+        open_sg_count += len(result["sg_ids"])
+        for sg_id in result["sg_ids"]:
+            if args.max_rows and len(listed) >= args.max_rows:
+                break
+            listed.append((sg_id, region))
+
+        exposures = result["exposures"]
+        for sg_id in sorted(exposures):
+            for protocol, from_port, to_port, sources, exposure in exposures[sg_id]:
+                exposure_table.add_row(region, sg_id, protocol, format_ports(protocol, from_port, to_port), ", ".join(sources), exposure)
+                if args.ports and protocol in PORT_PROTOCOLS:
+                    intervals.append((from_port, to_port, (region, sg_id, protocol, format_ports(protocol, from_port, to_port), ", ".join(sources), exposure)))
+
+        parents = result["transitive"]
+        for sg_id in sorted(parents):
+            parent_sg_id, protocol, from_port, to_port = parents[sg_id]
+            transitive_table.add_row(region, sg_id, format_exposure_path(sg_id, parents), f"{protocol} {format_ports(protocol, from_port, to_port)}")
+
+        for row in result["rows"]:
+            table.add_row(*row)
+
+    # Scan regions concurrently with a bounded pool
+    print(f"Fetching Security Groups with inbound rules open to the internet in {len(regions)} region(s)...")
+    start = time.perf_counter()
+    with PROFILER.phase("Region scan"), ThreadPoolExecutor(max_workers=max(1, min(args.max_workers, len(regions)))) as executor:
+        futures = {executor.submit(scan_region, clients, region, args.discovery, MIN_EXPOSURE_CHOICES[args.min_exposure], not args.no_transitive): region for region in regions}
+        for future in as_completed(futures):
+            region = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error scanning region {region}: {str(e)}")
+                continue
+            if discovery:
+                discovery.record(region, result["has_security_groups"])
+            add_region_rows(region, result)
+    elapsed = time.perf_counter() - start
+    if discovery:
+        discovery.save()
+
+    if not open_sg_count:
+        for report in (exposure_table, transitive_table, table):
+            report.close(console)
+        print("No Security Groups found with inbound rules open to the internet.")
+        sys.exit(0)
 
-    # Service checks
-    service_checks = [
-        ("RDS", check_rds, "Relational Database Service (RDS)"),
-        ("ECS", check_ecs, "Elastic Container Service (ECS)"),
-        ("EKS", check_eks, "Elastic Kubernetes Service (EKS)"),
-        ("EC2", check_ec2, "Elastic Compute Cloud (EC2)"),
-        ("ELB", check_elb, "Elastic Load Balancing (ELB)"),
-        ("VPC", check_vpc, "Virtual Private Cloud (VPC)"),
-        ("ElastiCache", check_redis, "ElastiCache"),
-        ("MemoryDB", check_memorydb, "MemoryDB"),
-    ]
-
-    # Process each SG ID
-    for sg_id in sg_ids:
-        print(f"\nChecking associations for Security Group: {sg_id}...")
+    print(f"Found {open_sg_count} Security Groups with open or transitively exposed inbound rules:")
+    for sg_id, region in listed:
+        print(f"- {sg_id} ({region})")
+    if open_sg_count > len(listed):
+        print(f"... and {open_sg_count - len(listed)} more")
 
-        for service, function, description in service_checks:
-            result = check_service_associations(sg_id, service, lambda sg_id: function(sg_id, session), description)
-            if result:  # Add only if there's an association
-                table.add_row(sg_id, result["Service"], result["Description"], result["Result"])
+    exposure_table.print(console)
+    if transitive_table.rows > 0:
+        transitive_table.print(console)
+    else:
+        transitive_table.close(console)
+
+    # Answer port queries from the interval index
+    if args.ports:
+        port_index = PortIntervalIndex(intervals)
+        port_table = Table(title="Security Groups Exposing Requested Ports")
+        port_table.add_column("Port", justify="center", style="bold")
+        port_table.add_column("Region", justify="center")
+        port_table.add_column("SG ID", justify="center")
+        port_table.add_column("Protocol", justify="center")
+        port_table.add_column("Ports", justify="center")
+        port_table.add_column("Sources", justify="left")
+        port_table.add_column("Exposure", justify="center", style="red")
+        port_table = report_table(port_table, args, "ports")
+        for port in [int(port) for port in args.ports.split(",") if port.strip()]:
+            for match in sorted(port_index.query(port)):
+                port_table.add_row(str(port), *match)
+        if port_table.rows > 0:
+            port_table.print(console)
+        else:
+            port_table.close(console)
+            print(f"No Security Groups expose ports {args.ports} to the internet.")
 
     # Display the table if it has rows
-    if len(table.rows) > 0:
-        console.print(table)
+    if table.rows > 0:
+        table.print(console)
     else:
+        table.close(console)
         print("No associations found for any Security Group.")
+    print(f"Scanned {len(regions)} region(s) in {elapsed:.1f}s")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from rich.console import Console
+from rich.table import Table
+
+# Make the shared aws_security_common package importable when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_security_common.clients import get_client, get_client_pool
+from aws_security_common.instrumentation import PROFILER, add_profile_arguments, enable_profiling
+from aws_security_common.output import RowWriter
+from aws_security_common.regions import RegionDiscovery, add_region_arguments
+from aws_security_common.tools import load_tool
+
+console = Console()
+
+CHECKS = ["cloudformation", "sns", "sg", "iam", "sso"]
+FINDING_FIELDS = ["check", "region", "resource", "issue", "detail"]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Run the AWS-Security checks concurrently in one process")
+    parser.add_argument("--profile", type=str, default=None, help="AWS CLI profile name")
+    parser.add_argument("--checks", type=str, default=",".join(CHECKS),
+                        help=f"Comma-separated checks to run (default: {','.join(CHECKS)})")
+    parser.add_argument("--output", type=str, default="aws_security_findings.jsonl",
+                        help="Findings file; .csv writes CSV, .parquet Parquet (requires pyarrow), anything else JSON Lines; add .gz to compress")
+    parser.add_argument("--max-workers", type=int, default=16,
+                        help="Size of the shared scheduler running per-region work for all checks")
+    parser.add_argument("--gaad", type=str, default=None,
+                        help="Output of 'aws iam get-account-authorization-details' for the IAM check")
+    parser.add_argument("--sso-region", type=str, default=None, help="Region of the IAM Identity Center instance")
+    parser.add_argument("--sso-instance-arn", type=str, default=None,
+                        help="IAM Identity Center instance ARN, with --identity-store-id (discovered with sso-admin:ListInstances when omitted)")
+    parser.add_argument("--identity-store-id", type=str, default=None, help="Identity store ID of the --sso-instance-arn instance")
+    parser.add_argument("--search-actions", type=str, default=None,
+                        help="Comma-separated IAM actions to search for in SSO permission sets")
+    parser.add_argument("--sso-policy-role", type=str, default=None,
+                        help="Role name assumed in each member account to read customer managed policies for --search-actions")
+    add_region_arguments(parser)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    if bool(args.sso_instance_arn) != bool(args.identity_store_id):
+        parser.error("--sso-instance-arn and --identity-store-id must be given together")
+    return args
+
+
+# Thread-safe writer that streams findings to JSONL, CSV or Parquet as they are produced
+class FindingWriter:
+    def __init__(self, path):
+        self.path = path
+        self.rows = RowWriter(path, FINDING_FIELDS)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def write(self, check, region, resource, issue, detail=""):
+        with self.lock:
+            self.rows.write([check, region, resource, issue, detail])
+            self.rows.flush()
+            self.counts[check] = self.counts.get(check, 0) + 1
+
+    def close(self):
+        self.rows.close()
+
+
+# Shared state handed to every check
+class ScanContext:
+    def __init__(self, args, clients, discovery, scheduler, writer):
+        self.args = args
+        self.clients = clients
+        self.discovery = discovery
+        self.scheduler = scheduler
+        self.writer = writer
+        self.lock = threading.Lock()
+        self.region_errors = {}  # check -> number of regions that failed
+
+    # Run fn(region) for every selected region on the shared scheduler; a failing region is
+    # written as an error finding instead of aborting the check's other regions
+    def map_regions(self, check, service, fn):
+        def scan(region):
+            try:
+                return fn(region), None
+            except Exception as e:
+                return None, e
+
+        regions = self.discovery.regions(self.args.regions, self.args.skip_empty_regions, service=service)
+        for region, (has_resources, error) in zip(regions, self.scheduler.map(scan, regions)):
+            if error is not None:
+                self.writer.write(check, region, "", "Region scan failed", str(error))
+                with self.lock:
+                    self.region_errors[check] = self.region_errors.get(check, 0) + 1
+            elif has_resources is not None:
+                self.discovery.record(region, has_resources, service=service)
+        return regions
+
+
+def check_cloudformation(context):
+    cfn = load_tool("cloudformation")
+
+    def scan(region):
+        stacks = cfn.get_active_stacks(region, None)
+        if stacks is None:
+            # get_active_stacks reports the ClientError and returns None; fail the region rather than pass it as clean
+            raise RuntimeError("cloudformation:ListStacks failed")
+        for stack in stacks:
+            protected = cfn.get_termination_protection_status(stack["StackName"], region, None)
+            if protected is None:
+                context.writer.write("cloudformation", region, stack["StackName"],
+                                     "Termination protection status unavailable", "cloudformation:DescribeStacks failed")
+            elif not protected:
+                context.writer.write("cloudformation", region, stack["StackName"],
+                                     "Termination protection disabled", stack["StackStatus"])
+        return stacks
+
+    context.map_regions("cloudformation", "cloudformation", scan)
+
+
+def check_sns(context):
+    sns = load_tool("sns")
+
+    def scan(region):
+        topics = sns.get_sns_topics(region)
+        sns_client = get_client("sns", region)
+        for topic in topics:
+            if not sns.check_topic_encryption(sns_client, topic["TopicArn"]):
+                context.writer.write("sns", region, topic["TopicArn"], "Topic not encrypted")
+        return topics
+
+    context.map_regions("sns", "sns", scan)
+
+
+def check_sg(context):
+    sg = load_tool("sg")
+
+    def scan(region):
+        result = sg.scan_region(context.clients, region)
+        for sg_id, exposures in sorted(result["exposures"].items()):
+            for protocol, from_port, to_port, sources, exposure in exposures:
+                context.writer.write("sg", region, sg_id, f"{exposure} ingress",
+                                     f"{protocol} {sg.format_ports(protocol, from_port, to_port)} from {', '.join(sources)}")
+        for sg_id in sorted(result["transitive"]):
+            context.writer.write("sg", region, sg_id, "Transitively exposed",
+                                 sg.format_exposure_path(sg_id, result["transitive"]))
+        for row_region, sg_id, service, description, resources in result["rows"]:
+            context.writer.write("sg", region, sg_id, f"Attached {service} resources", resources)
+        return result["has_security_groups"]
+
+    context.map_regions("sg", "security-groups", scan)
+
+
+def check_iam(context):
+    if not context.args.gaad:
+        return "skipped (no --gaad file)"
+    iam = load_tool("iam")
+    with open(context.args.gaad) as f:
+        data = json.load(f)
+    for principal, policy_name, resource_type, policy_type, permission in iam.iter_matching_permissions(data):
+        context.writer.write("iam", "global", f"{resource_type}/{principal}", "Sensitive permission",
+                             f"{permission} via {policy_type} policy {policy_name}")
+
+
+def check_sso(context):
+    if not context.args.search_actions:
+        return "skipped (no --search-actions)"
+    sso = load_tool("sso")
+    sso.init_clients(None, context.args.sso_region)
+    if context.args.sso_instance_arn:
+        sso.INSTANCE_ARN = context.args.sso_instance_arn
+        sso.IDENTITY_STORE_ID = context.args.identity_store_id
+    else:
+        instances = sso.sso_admin_client.list_instances()["Instances"]
+        if not instances:
+            return "skipped (no Identity Center instance)"
+        sso.INSTANCE_ARN = instances[0]["InstanceArn"]
+        sso.IDENTITY_STORE_ID = instances[0]["IdentityStoreId"]
+
+    assignments_data, policies_data = sso.fetch_permission_set_data_all(sso.list_permission_sets())
+    searched_actions = [action.strip() for action in context.args.search_actions.split(",") if action.strip()]
+    sso.args.policy_role = context.args.sso_policy_role
+    for match in sso.iter_action_matches(policies_data, assignments_data, searched_actions, sso.args.policy_cache):
+        context.writer.write("sso", "global", f"{match['Type']}/{match['Name']}", f"Grants {match['Action']}",
+                             f"{match['Permission Set']} in account {match['Account ID']} via {match['Policy Name']} ({match['Granted By']})")
+
+
+CHECK_FUNCTIONS = {
+    "cloudformation": check_cloudformation,
+    "sns": check_sns,
+    "sg": check_sg,
+    "iam": check_iam,
+    "sso": check_sso,
+}
+
+
+# Run one check and return (status, seconds)
+def run_check(name, context):
+    start = time.perf_counter()
+    try:
+        with PROFILER.phase(f"Check: {name}"):
+            status = CHECK_FUNCTIONS[name](context) or "ok"
+        if context.region_errors.get(name):
+            status = f"{status} ({context.region_errors[name]} region(s) failed)"
+    except Exception as e:
+        status = f"error: {str(e)}"
+    return status, time.perf_counter() - start
+
+
+def main():
+    args = parse_arguments()
+    checks = [check.strip() for check in args.checks.split(",") if check.strip()]
+    unknown = [check for check in checks if check not in CHECK_FUNCTIONS]
+    if unknown:
+        console.print(f"[bold red]Unknown checks: {', '.join(unknown)}[/bold red]")
+        sys.exit(1)
+
+    # Resolve credentials once: every tool then shares the default client pool
+    if args.profile:
+        os.environ["AWS_PROFILE"] = args.profile
+    enable_profiling(args.profile_report, console)
+    clients = get_client_pool()
+    with PROFILER.phase("Region discovery"):
+        discovery = RegionDiscovery(clients, "scanner", ttl=args.region_cache_ttl, refresh=args.refresh_regions)
+        discovery.enabled_regions()
+
+    writer = FindingWriter(args.output)
+    console.print(f"[bold blue]Running checks: {', '.join(checks)}[/bold blue]")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.max_workers) as scheduler:
+        context = ScanContext(args, clients, discovery, scheduler, writer)
+        # Checks run on their own threads and submit per-region work to the shared scheduler
+        with ThreadPoolExecutor(max_workers=len(checks)) as check_executor:
+            futures = {check: check_executor.submit(run_check, check, context) for check in checks}
+            results = {check: future.result() for check, future in futures.items()}
+    elapsed = time.perf_counter() - start
+    discovery.save()
+    writer.close()
+
+    table = Table(title="Scan Summary")
+    table.add_column("Check", style="cyan")
+    table.add_column("Status", style="white")
+    table.add_column("Findings", justify="right", style="yellow")
+    table.add_column("Time (s)", justify="right", style="green")
+    for check in checks:
+        status, seconds = results[check]
+        table.add_row(check, status, str(writer.counts.get(check, 0)), f"{seconds:.1f}")
+    console.print(table)
+    console.print(f"Findings written to {args.output} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
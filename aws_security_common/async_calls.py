@@ -0,0 +1,86 @@
+"""
+asyncio execution path for high fan-out AWS lookups.
+
+Checks such as per-topic get_topic_attributes or per-stack describe_stacks
+are almost pure network I/O. AsyncAwsCaller runs them on one event loop
+with aiobotocore, bounding the number of in-flight requests with a
+semaphore instead of a large thread pool.
+
+aiobotocore is optional and only needed when a tool is run with --async:
+
+    pip install aiobotocore
+"""
+
+import asyncio
+from contextlib import AsyncExitStack
+
+from aws_security_common.instrumentation import PROFILER
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:  # Optional dependency
+    AioConfig = None
+    get_session = None
+
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+def add_async_arguments(parser):
+    """Add the --async and --max-concurrency options."""
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run the per-resource lookups concurrently on asyncio (requires aiobotocore)")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help=f"Maximum in-flight AWS requests with --async (default: {DEFAULT_MAX_CONCURRENCY})")
+
+
+class AsyncAwsCaller:
+    """aiobotocore clients per (service, region) sharing one concurrency limit; use as an async context manager."""
+
+    def __init__(self, profile_name=None, region_name=None, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        if get_session is None:
+            raise RuntimeError("aiobotocore is required for --async (pip install aiobotocore)")
+        self.session = get_session()
+        if profile_name:
+            self.session.set_config_variable("profile", profile_name)
+        self.region_name = region_name or self.session.get_config_variable("region")
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.config = AioConfig(retries={"max_attempts": 10, "mode": "standard"}, max_pool_connections=max_concurrency)
+        self.clients = {}
+        self.client_lock = asyncio.Lock()
+        self.exit_stack = AsyncExitStack()
+
+    async def __aenter__(self):
+        await self.exit_stack.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self.exit_stack.__aexit__(*exc_info)
+
+    async def client(self, service, region=None):
+        key = (service, region or self.region_name)
+        async with self.client_lock:
+            if key not in self.clients:
+                self.clients[key] = PROFILER.instrument(await self.exit_stack.enter_async_context(
+                    self.session.create_client(service, region_name=key[1], config=self.config)))
+            return self.clients[key]
+
+    async def call(self, service, region, operation, **kwargs):
+        """Run one API operation once a concurrency slot is free."""
+        client = await self.client(service, region)
+        async with self.semaphore:
+            return await getattr(client, operation)(**kwargs)
+
+    async def paginate(self, service, region, operation, **kwargs):
+        """Return every page of a paginated operation; each page request takes a concurrency slot."""
+        client = await self.client(service, region)
+        pages = []
+        iterator = client.get_paginator(operation).paginate(**kwargs).__aiter__()
+        while True:
+            async with self.semaphore:
+                try:
+                    page = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+            pages.append(page)
+        return pages
@@ -0,0 +1,99 @@
+"""
+Append-only checkpoint journal for long-running enumerations.
+
+Tools record each completed unit of work (a region, a stack, a permission
+set) with its result as one JSON line. If a run is interrupted by an error,
+an expired SSO token or Ctrl-C, rerunning it with --resume reloads the
+finished units and only fetches the rest. The journal is deleted once the
+enumeration completes.
+
+The first line identifies the run (tool, account or instance). A journal
+written for a different run is ignored and replaced. On resume the journal is
+rewritten with only its intact lines, so a line cut short by the interruption
+never ends up in front of the records appended by the resumed run.
+"""
+
+import json
+import os
+import threading
+
+
+def add_checkpoint_arguments(parser, default_path):
+    """Add the --resume and --checkpoint options."""
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip work already completed by an interrupted run, using the checkpoint journal")
+    parser.add_argument("--checkpoint", type=str, default=default_path,
+                        help=f"Path of the checkpoint journal (default: {default_path})")
+
+
+class CheckpointJournal:
+    """Completed units and their results, persisted to a JSON Lines file as they finish."""
+
+    def __init__(self, path, run_key, resume=False):
+        self.path = path
+        self.run_key = run_key
+        self.lock = threading.Lock()
+        self.results = self._load() if resume else {}
+        self.resumed = len(self.results)
+        # Start a fresh journal for this run, or keep only the intact records of the resumed one
+        self._rewrite()
+        self.file = open(self.path, "a")
+
+    def _load(self):
+        try:
+            with open(self.path) as file:
+                lines = file.read().splitlines()
+        except OSError:
+            return {}
+        try:
+            if not lines or json.loads(lines[0]).get("run") != self.run_key:
+                return {}
+        except ValueError:
+            return {}
+        results = {}
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # A line cut short by the interruption; everything before it is intact
+            results[entry["unit"]] = entry["result"]
+        return results
+
+    def _rewrite(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(json.dumps({"run": self.run_key}) + "\n")
+            for key, result in self.results.items():
+                file.write(json.dumps({"unit": key, "result": result}) + "\n")
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def _key(unit):
+        return json.dumps(list(unit))
+
+    def done(self, unit):
+        """Whether a unit, e.g. ("region", "us-east-1"), was completed."""
+        return self._key(unit) in self.results
+
+    def result(self, unit):
+        return self.results[self._key(unit)]
+
+    def record(self, unit, result):
+        """Persist a completed unit; result must be JSON-serialisable."""
+        key = self._key(unit)
+        with self.lock:
+            self.results[key] = result
+            self.file.write(json.dumps({"unit": key, "result": result}) + "\n")
+            self.file.flush()
+
+    def close(self):
+        """Stop recording but keep the journal, e.g. when some units failed and should be retried with --resume."""
+        with self.lock:
+            self.file.close()
+
+    def complete(self):
+        """The enumeration finished, so the journal is no longer needed."""
+        with self.lock:
+            self.file.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,71 @@
+"""
+Shared, thread-safe boto3 session and client pool.
+
+Creating a boto3 client loads the service model and resolves endpoints, so
+every tool gets its clients from here instead of building them per call.
+Clients are cached per (profile, region, service) and configured with
+adaptive retries and a connection pool large enough for concurrent scans.
+"""
+
+import threading
+
+import boto3
+from botocore.config import Config
+
+from aws_security_common.instrumentation import PROFILER
+
+# Adaptive retry mode backs off client-side when AWS starts throttling
+CLIENT_CONFIG = Config(
+    retries={"max_attempts": 10, "mode": "adaptive"},
+    max_pool_connections=50,
+)
+
+
+class ClientPool:
+    """One boto3 session for a profile and a cache of its clients per (service, region)."""
+
+    def __init__(self, profile_name=None, region_name=None, session=None):
+        self.session = session or boto3.Session(profile_name=profile_name, region_name=region_name)
+        self.region_name = self.session.region_name
+        self.clients = {}
+        self.role_pools = {}
+        self.lock = threading.Lock()
+
+    def get(self, service, region=None):
+        key = (service, region or self.region_name)
+        with self.lock:  # boto3 sessions are not thread-safe, clients are
+            if key not in self.clients:
+                self.clients[key] = PROFILER.instrument(
+                    self.session.client(service, region_name=key[1], config=CLIENT_CONFIG))
+            return self.clients[key]
+
+    def assume_role(self, role_arn, session_name="aws-security"):
+        """Return a pool whose clients use the temporary credentials of role_arn, assumed once per pool."""
+        with self.lock:
+            if role_arn in self.role_pools:
+                return self.role_pools[role_arn]
+        credentials = self.get("sts").assume_role(RoleArn=role_arn, RoleSessionName=session_name)["Credentials"]
+        session = boto3.Session(aws_access_key_id=credentials["AccessKeyId"],
+                                aws_secret_access_key=credentials["SecretAccessKey"],
+                                aws_session_token=credentials["SessionToken"],
+                                region_name=self.region_name)
+        with self.lock:
+            return self.role_pools.setdefault(role_arn, ClientPool(session=session))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_client_pool(profile_name=None, region_name=None):
+    """Return the process-wide client pool for a profile and default region."""
+    key = (profile_name, region_name)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ClientPool(profile_name, region_name)
+        return _pools[key]
+
+
+def get_client(service, region=None, profile_name=None):
+    """Return a cached client for (profile, region, service)."""
+    return get_client_pool(profile_name).get(service, region)
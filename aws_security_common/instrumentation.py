@@ -0,0 +1,238 @@
+"""
+API-call instrumentation and per-phase timing for the AWS tools.
+
+Every client from the shared pool (and every aiobotocore client of the
+async path) has botocore event handlers registered on it. While profiling
+is enabled they record, per (service, operation, region), the call count,
+errors, retries, throttling responses and a latency histogram. Tools wrap
+the stages of their main() in PROFILER.phase(...) to get wall time per
+phase.
+
+Run a tool with --profile-report to print the summary at exit, or with
+--profile-report report.json to write it as JSON instead.
+"""
+
+import atexit
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from rich.console import Console
+from rich.table import Table
+
+# Upper bounds of the latency histogram buckets in milliseconds; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Error codes AWS uses to signal throttling
+THROTTLE_ERROR_CODES = {
+    "Throttling", "ThrottlingException", "ThrottledException", "RequestThrottledException",
+    "TooManyRequestsException", "ProvisionedThroughputExceededException", "TransactionInProgressException",
+    "RequestLimitExceeded", "BandwidthLimitExceeded", "LimitExceededException", "RequestThrottled",
+    "SlowDown", "PriorRequestNotComplete", "EC2ThrottledException",
+}
+
+
+def add_profile_arguments(parser):
+    """Add the --profile-report option."""
+    parser.add_argument("--profile-report", nargs="?", const="-", default=None, metavar="FILE",
+                        help="Record AWS API calls and phase timings; print a summary at exit, or write JSON to FILE")
+
+
+class OperationStats:
+    """Counters and latency histogram for one (service, operation, region)."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttles = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, seconds, error, retries):
+        self.calls += 1
+        self.errors += int(error)
+        self.retries += retries
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        milliseconds = seconds * 1000
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if milliseconds <= bound), len(LATENCY_BUCKETS_MS))
+        self.histogram[bucket] += 1
+
+    def percentile(self, fraction):
+        """Upper bound in ms of the histogram bucket holding the given fraction of calls (None when open-ended)."""
+        threshold = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.histogram):
+            seen += count
+            if seen >= threshold:
+                return bound
+        return None
+
+    def to_dict(self):
+        buckets = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "throttles": self.throttles,
+            "total_seconds": round(self.total_seconds, 6),
+            "mean_ms": round(self.total_seconds * 1000 / self.calls, 3) if self.calls else 0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "latency_histogram": dict(zip(buckets, self.histogram)),
+        }
+
+
+class Profiler:
+    """Collects API-call statistics from botocore event hooks and wall time per phase."""
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.operations = {}
+        self.phases = {}
+        self.total_calls = 0
+        self.started = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.perf_counter()
+
+    def _stats(self, service, operation, region):
+        key = (service, operation, region or "global")
+        if key not in self.operations:
+            self.operations[key] = OperationStats()
+        return self.operations[key]
+
+    def instrument(self, client):
+        """Register the event handlers on a boto3 or aiobotocore client."""
+        region = client.meta.region_name
+        events = client.meta.events
+        events.register("before-parameter-build", self._start_call)
+        events.register("after-call", lambda **kwargs: self._after_call(region, **kwargs))
+        events.register("after-call-error", lambda **kwargs: self._after_call_error(region, **kwargs))
+        events.register("needs-retry", lambda **kwargs: self._needs_retry(region, **kwargs))
+        return client
+
+    def _start_call(self, model, context, **kwargs):
+        if self.enabled:
+            context["profile_start"] = time.perf_counter()
+            context["profile_operation"] = (model.service_model.service_name, model.name)
+
+    def _after_call(self, region, model, parsed, context, http_response, **kwargs):
+        start = context.pop("profile_start", None)
+        context.pop("profile_operation", None)
+        if start is None:
+            return
+        retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        with self.lock:
+            self._stats(model.service_model.service_name, model.name, region).add(
+                time.perf_counter() - start, http_response.status_code >= 300, retries)
+            self.total_calls += 1
+
+    # Connection errors and exhausted retries raise before after-call is emitted
+    def _after_call_error(self, region, context, exception, **kwargs):
+        start = context.pop("profile_start", None)
+        if start is None:
+            return
+        service, operation = context.pop("profile_operation")
+        with self.lock:
+            self._stats(service, operation, region).add(time.perf_counter() - start, True, 0)
+            self.total_calls += 1
+
+    # Emitted after every attempt, so each throttled attempt is counted even if a retry succeeds
+    def _needs_retry(self, region, operation, response=None, **kwargs):
+        if not self.enabled or response is None:
+            return None
+        error_code = response[1].get("Error", {}).get("Code")
+        if error_code in THROTTLE_ERROR_CODES:
+            with self.lock:
+                self._stats(operation.service_model.service_name, operation.name, region).throttles += 1
+        return None
+
+    @contextmanager
+    def phase(self, name):
+        """Accumulate wall time and API calls made while the block runs under a named phase."""
+        start = time.perf_counter()
+        calls = self.total_calls
+        try:
+            yield
+        finally:
+            with self.lock:
+                seconds, phase_calls = self.phases.get(name, (0.0, 0))
+                self.phases[name] = (seconds + time.perf_counter() - start, phase_calls + self.total_calls - calls)
+
+    def report(self):
+        """Return the collected statistics as a JSON-serialisable dict."""
+        with self.lock:
+            operations = sorted(self.operations.items(), key=lambda item: item[1].total_seconds, reverse=True)
+            return {
+                "wall_seconds": round(time.perf_counter() - self.started, 6),
+                "api_calls": self.total_calls,
+                "phases": [{"phase": name, "seconds": round(seconds, 6), "api_calls": calls}
+                           for name, (seconds, calls) in self.phases.items()],
+                "operations": [dict(service=service, operation=operation, region=region, **stats.to_dict())
+                               for (service, operation, region), stats in operations],
+            }
+
+    def print_report(self, console=None):
+        console = console or Console()
+        report = self.report()
+
+        phase_table = Table(title=f"Phase Timings ({report['wall_seconds']:.1f}s total)")
+        phase_table.add_column("Phase", style="cyan")
+        phase_table.add_column("Time (s)", justify="right", style="green")
+        phase_table.add_column("API Calls", justify="right", style="yellow")
+        for phase in report["phases"]:
+            phase_table.add_row(phase["phase"], f"{phase['seconds']:.2f}", str(phase["api_calls"]))
+        console.print(phase_table)
+
+        call_table = Table(title=f"AWS API Calls ({report['api_calls']} total)")
+        call_table.add_column("Service", style="cyan")
+        call_table.add_column("Operation", style="cyan")
+        call_table.add_column("Region", style="cyan")
+        call_table.add_column("Calls", justify="right", style="yellow")
+        call_table.add_column("Errors", justify="right", style="red")
+        call_table.add_column("Retries", justify="right", style="red")
+        call_table.add_column("Throttles", justify="right", style="red")
+        call_table.add_column("p50 (ms)", justify="right", style="green")
+        call_table.add_column("p95 (ms)", justify="right", style="green")
+        call_table.add_column("Max (ms)", justify="right", style="green")
+        call_table.add_column("Total (s)", justify="right", style="green")
+        for op in report["operations"]:
+            call_table.add_row(
+                op["service"], op["operation"], op["region"], str(op["calls"]), str(op["errors"]),
+                str(op["retries"]), str(op["throttles"]),
+                f"<={op['p50_ms']}" if op["p50_ms"] is not None else f">{LATENCY_BUCKETS_MS[-1]}",
+                f"<={op['p95_ms']}" if op["p95_ms"] is not None else f">{LATENCY_BUCKETS_MS[-1]}",
+                f"{op['max_ms']:.0f}", f"{op['total_seconds']:.2f}")
+        if report["operations"]:
+            console.print(call_table)
+
+    def write_report(self, path):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+
+# Process-wide profiler; handlers are registered on every pooled client but only record once enabled
+PROFILER = Profiler()
+
+
+def enable_profiling(report_path, console=None):
+    """Start recording and print ("-") or write the report to report_path when the process exits."""
+    if not report_path or PROFILER.enabled:
+        return
+    PROFILER.enable()
+
+    def emit_report():
+        if report_path == "-":
+            PROFILER.print_report(console)
+        else:
+            PROFILER.write_report(report_path)
+            (console or Console()).print(f"Profile report written to {report_path}")
+
+    atexit.register(emit_report)
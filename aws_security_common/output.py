@@ -0,0 +1,211 @@
+"""
+Bounded-memory report output for large result sets.
+
+ReportTable wraps a tool's Rich table. Only the first --max-rows rows are
+added to it; the rows beyond that are counted per value of a summary column
+(e.g. per region) and shown as a short summary under the table. With
+--export PATH every row is also streamed to a file as it is produced, so the
+full result never has to be rendered or held in memory:
+
+    --export report.csv         CSV
+    --export report.jsonl       JSON Lines (one object per row)
+    --export report.csv.gz      gzip-compressed CSV or JSON Lines
+    --export report.parquet     compressed columnar Parquet (requires pyarrow)
+
+A tool printing several tables writes one file per table, named after the
+table (report-assignments.csv, report-policies.csv, ...).
+
+pyarrow is optional and only needed for .parquet exports:
+
+    pip install pyarrow
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+from collections import Counter
+
+from rich.console import Console
+from rich.errors import MarkupError
+from rich.markup import render
+from rich.table import Table
+from rich.text import Text
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional dependency
+    pyarrow = None
+
+DEFAULT_MAX_ROWS = 500
+
+# Rows buffered per Parquet row group; bounds the memory of a columnar export
+PARQUET_BATCH_ROWS = 10000
+
+# Omitted-row counts listed under a capped table
+SUMMARY_GROUPS = 10
+
+
+def add_output_arguments(parser):
+    """Add the --max-rows and --export options."""
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_MAX_ROWS,
+                        help=f"Rows rendered per table; the rest are summarised (default: {DEFAULT_MAX_ROWS}, 0 renders all)")
+    parser.add_argument("--export", type=str, default=None, metavar="PATH",
+                        help="Stream every table row to PATH: .csv, .jsonl, either with .gz, or .parquet (requires pyarrow)")
+
+
+def export_path(path, name=None):
+    """Path of a table's export file; name is inserted before the extension (report.csv.gz -> report-name.csv.gz)."""
+    if not path or not name:
+        return path
+    stem, extension = os.path.splitext(path)
+    if extension == ".gz":
+        stem, inner_extension = os.path.splitext(stem)
+        extension = inner_extension + extension
+    return f"{stem}-{name}{extension}"
+
+
+def plain_text(cell):
+    """A cell without Rich markup, for export."""
+    if cell is None:
+        return ""
+    if not isinstance(cell, str):
+        return getattr(cell, "plain", str(cell))
+    try:
+        return render(cell).plain
+    except MarkupError:
+        return cell  # Brackets that are data, not markup
+
+
+def open_output(path):
+    """Open a text file for writing, gzip-compressed when the path ends in .gz."""
+    if path.lower().endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "wb"), encoding="utf-8", newline="")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def header_text(column):
+    """Plain text of a Rich column header; headers may be renderables such as Align."""
+    return plain_text(getattr(column.header, "renderable", column.header))
+
+
+class RowWriter:
+    """Writes rows to CSV, JSON Lines or Parquet as they are produced; chosen by the file extension."""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+        lower = path.lower()
+        if lower.endswith(".gz"):
+            lower = lower[:-3]
+        self.format = "parquet" if lower.endswith(".parquet") else "csv" if lower.endswith(".csv") else "jsonl"
+
+        if self.format == "parquet":
+            if pyarrow is None:
+                raise RuntimeError("pyarrow is required for .parquet exports (pip install pyarrow)")
+            self.schema = pyarrow.schema([(column, pyarrow.string()) for column in self.columns])
+            self.parquet_writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+            self.batch = []
+            return
+
+        self.file = open_output(path)
+        if self.format == "csv":
+            self.csv_writer = csv.writer(self.file)
+            self.csv_writer.writerow(self.columns)
+
+    def write(self, row):
+        """Write one row, a sequence of values in column order."""
+        values = ["" if value is None else str(value) for value in row]
+        self.rows += 1
+        if self.format == "csv":
+            self.csv_writer.writerow(values)
+        elif self.format == "jsonl":
+            self.file.write(json.dumps(dict(zip(self.columns, values))) + "\n")
+        else:
+            self.batch.append(values)
+            if len(self.batch) >= PARQUET_BATCH_ROWS:
+                self._write_batch()
+
+    def _write_batch(self):
+        columns = [pyarrow.array([row[i] for row in self.batch], pyarrow.string()) for i in range(len(self.columns))]
+        self.parquet_writer.write_table(pyarrow.Table.from_arrays(columns, schema=self.schema))
+        self.batch = []
+
+    def flush(self):
+        if self.format != "parquet":
+            self.file.flush()
+
+    def close(self):
+        if self.format == "parquet":
+            if self.batch:
+                self._write_batch()
+            self.parquet_writer.close()
+        else:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReportTable:
+    """A Rich table that renders at most max_rows rows and streams every row to an optional export file."""
+
+    def __init__(self, table, max_rows=DEFAULT_MAX_ROWS, export=None, summary_column=0, columns=None):
+        self.table = table
+        self.max_rows = max_rows
+        self.summary_column = summary_column
+        self.omitted = Counter()
+        self.rows = 0
+        self.writer = None
+        if export:
+            columns = columns or [header_text(column) for column in table.columns]
+            self.writer = RowWriter(export, columns)
+
+    def add_row(self, *cells):
+        self.rows += 1
+        if self.writer:
+            # Cells are rendered as Rich markup, so the export gets the text the table shows
+            self.writer.write([plain_text(cell) for cell in cells])
+        if not self.max_rows or self.rows <= self.max_rows:
+            self.table.add_row(*cells)
+        elif self.summary_column is not None:
+            self.omitted[plain_text(cells[self.summary_column])] += 1
+        else:
+            self.omitted[""] += 1
+
+    def print(self, console=None, *objects):
+        """Print the table (after any leading objects), a summary of the rows not rendered, and close the export."""
+        console = console or Console()
+        console.print(*objects, self.table)
+        hidden = sum(self.omitted.values())
+        if hidden:
+            saved = f"all rows are in {self.writer.path}" if self.writer else "use --max-rows 0 to render all"
+            console.print(f"[bold yellow]{hidden} more row(s) not shown (--max-rows {self.max_rows}); {saved}.[/bold yellow]")
+            if self.summary_column is not None:
+                summary = Table(title="Rows Not Shown", title_style="bold yellow")
+                summary.add_column(header_text(self.table.columns[self.summary_column]), style="cyan")
+                summary.add_column("Rows", justify="right", style="yellow")
+                groups = self.omitted.most_common()
+                for value, count in groups[:SUMMARY_GROUPS]:
+                    summary.add_row(Text(value), str(count))
+                if len(groups) > SUMMARY_GROUPS:
+                    summary.add_row(f"... {len(groups) - SUMMARY_GROUPS} more", str(sum(count for value, count in groups[SUMMARY_GROUPS:])))
+                console.print(summary)
+        self.close(console)
+
+    def close(self, console=None):
+        if self.writer:
+            self.writer.close()
+            (console or Console()).print(f"{self.writer.rows} row(s) exported to {self.writer.path}")
+            self.writer = None
+
+
+def report_table(table, args, name=None, summary_column=0, columns=None):
+    """ReportTable configured from the --max-rows and --export options; name distinguishes a tool's tables."""
+    return ReportTable(table, args.max_rows, export_path(args.export, name), summary_column, columns)
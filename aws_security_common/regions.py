@@ -0,0 +1,109 @@
+"""
+Cached region discovery shared by the multi-region tools.
+
+Enabled regions are cached on disk per account with a TTL so scheduled scans
+do not call ec2:DescribeRegions on every run. Each tool also records whether
+it found resources in a region; with --skip-empty-regions, regions that were
+empty for that service on the previous run (within the TTL) are skipped.
+"""
+
+import json
+import os
+import threading
+import time
+from fnmatch import fnmatchcase
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aws-security")
+DEFAULT_TTL = 24 * 60 * 60  # seconds
+
+
+def add_region_arguments(parser):
+    """Add the --regions, --skip-empty-regions, --refresh-regions and --region-cache-ttl options."""
+    parser.add_argument("--regions", type=str, default=None,
+                        help="Comma-separated region include/exclude patterns, e.g. 'us-*,eu-west-1,!us-west-1'; "
+                             "a leading '-' also excludes when written as --regions=-us-west-1")
+    parser.add_argument("--skip-empty-regions", action="store_true",
+                        help="Skip regions where the previous run found no resources for this tool")
+    parser.add_argument("--refresh-regions", action="store_true",
+                        help="Ignore the cached region list and probe results")
+    parser.add_argument("--region-cache-ttl", type=int, default=DEFAULT_TTL,
+                        help="Seconds before cached regions and probe results expire (default: one day)")
+
+
+def filter_regions(regions, patterns):
+    """Apply include/exclude patterns; patterns starting with '!' or '-' exclude.
+
+    argparse reads "--regions -us-west-1" as an unknown option, so a list starting
+    with '-' must be passed as --regions=-us-west-1.
+    """
+    if not patterns:
+        return list(regions)
+    patterns = [pattern.strip() for pattern in patterns.split(",") if pattern.strip()]
+    includes = [pattern for pattern in patterns if pattern[0] not in "!-"]
+    excludes = [pattern[1:] for pattern in patterns if pattern[0] in "!-"]
+    return [region for region in regions
+            if (not includes or any(fnmatchcase(region, pattern) for pattern in includes))
+            and not any(fnmatchcase(region, pattern) for pattern in excludes)]
+
+
+class RegionDiscovery:
+    """Enabled regions of the pool's account, cached on disk, plus per-service probe results."""
+
+    def __init__(self, pool, service, ttl=DEFAULT_TTL, refresh=False, cache_dir=None):
+        self.pool = pool
+        self.service = service
+        self.ttl = ttl
+        self.refresh = refresh
+        self.cache_dir = cache_dir or os.environ.get("AWS_SECURITY_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.lock = threading.Lock()
+        self.account_id = pool.get("sts").get_caller_identity()["Account"]
+        self.cache_path = os.path.join(self.cache_dir, f"regions-{self.account_id}.json")
+        self.cache = self._load()
+
+    def _load(self):
+        if self.refresh or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _fresh(self, timestamp):
+        return time.time() - timestamp < self.ttl
+
+    def enabled_regions(self):
+        """Regions enabled for the account, from the cache when it is still fresh."""
+        cached = self.cache.get("enabled_regions")
+        if cached and self._fresh(cached["timestamp"]):
+            return cached["regions"]
+        response = self.pool.get("ec2").describe_regions()  # Only opted-in and default regions
+        regions = sorted(region["RegionName"] for region in response["Regions"])
+        self.cache["enabled_regions"] = {"timestamp": time.time(), "regions": regions}
+        self.save()
+        return regions
+
+    def regions(self, patterns=None, skip_empty=False, service=None):
+        """Enabled regions after the include/exclude filter, optionally without known-empty regions."""
+        regions = filter_regions(self.enabled_regions(), patterns)
+        if skip_empty:
+            probes = self.cache.get("probes", {}).get(service or self.service, {})
+            regions = [region for region in regions
+                       if region not in probes
+                       or probes[region]["has_resources"]
+                       or not self._fresh(probes[region]["timestamp"])]
+        return regions
+
+    def record(self, region, has_resources, service=None):
+        """Remember whether this tool found resources in a region; call save() once the scan is done."""
+        with self.lock:
+            probes = self.cache.setdefault("probes", {}).setdefault(service or self.service, {})
+            probes[region] = {"timestamp": time.time(), "has_resources": bool(has_resources)}
+
+    def save(self):
+        with self.lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump(self.cache, file)
+            os.replace(temp_path, self.cache_path)
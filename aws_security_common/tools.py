@@ -0,0 +1,35 @@
+"""
+Load the tool scripts as modules so they can be driven from one process.
+
+The tools live in directories with spaces and some file names contain
+hyphens, so they are loaded by path rather than imported by name.
+"""
+
+import importlib.util
+import os
+import threading
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TOOL_PATHS = {
+    "cloudformation": ("AWS Cloudformation termination protection manager", "AWS_Cloudformation_termination_protection_manager.py"),
+    "sns": ("AWS SNS Encryption checker", "SNSEncryptionfull.py"),
+    "sg": ("AWS Security Group Internet Exposure Checker", "AWS_sg_internet_exposure_checker.py"),
+    "iam": ("AWS IAM permissions checker", "aws-iam-permissions-checker.py"),
+    "sso": ("AWS SSO permissions checker", "aws-SSO-permissions-checker.py"),
+}
+
+_modules = {}
+_lock = threading.Lock()
+
+
+def load_tool(name):
+    """Import a tool script once and return the module (its __main__ block does not run)."""
+    with _lock:
+        if name not in _modules:
+            path = os.path.join(REPO_ROOT, *TOOL_PATHS[name])
+            spec = importlib.util.spec_from_file_location(f"aws_security_tool_{name}", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _modules[name] = module
+        return _modules[name]